@@ -3,13 +3,11 @@ import sys
 from logging.config import fileConfig
 
 from app.models import Base
-from dotenv import load_dotenv
-from sqlalchemy import engine_from_config, pool
+from app.settings import get_settings
+from sqlalchemy import engine_from_config, make_url, pool, text
 
 from alembic import context
 
-load_dotenv()
-
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 
@@ -17,8 +15,11 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 # access to the values within the .ini file in use.
 config = context.config
 
-database_url = os.getenv("DATABASE_URL", "sqlite:///url_shortener.db")
-config.set_main_option("sqlalchemy.url", database_url)
+# With sharding every shard database gets the same schema; migrations run
+# against (or, offline, render SQL for) each of them in turn.
+settings = get_settings()
+database_urls = settings.shard_database_urls or (settings.database_url,)
+config.set_main_option("sqlalchemy.url", database_urls[0])
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -37,6 +38,15 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Options shared by offline and online runs. Each revision commits on its
+# own, so revisions using app.migration_helpers (which commit as they go)
+# don't leave earlier revisions half applied; on SQLite, batch mode
+# rewrites ALTER operations it can't run as copy-and-rename.
+migration_options = {
+    "target_metadata": target_metadata,
+    "transaction_per_migration": True,
+}
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -49,17 +59,23 @@ def run_migrations_offline() -> None:
     Calls to context.execute() here emit the given string to the
     script output.
 
+    With several shards the script holds one section per shard database,
+    each headed by a comment naming it.
     """
-    url = config.get_main_option("sqlalchemy.url")
-    context.configure(
-        url=url,
-        target_metadata=target_metadata,
-        literal_binds=True,
-        dialect_opts={"paramstyle": "named"},
-    )
+    for url in database_urls:
+        context.configure(
+            url=url,
+            literal_binds=True,
+            dialect_opts={"paramstyle": "named"},
+            **migration_options,
+            render_as_batch=make_url(url).get_backend_name() == "sqlite",
+        )
+        if len(database_urls) > 1:
+            name = make_url(url).render_as_string(hide_password=True)
+            context.get_context().impl.static_output(f"-- Database: {name}\n")
 
-    with context.begin_transaction():
-        context.run_migrations()
+        with context.begin_transaction():
+            context.run_migrations()
 
 
 def run_migrations_online() -> None:
@@ -69,17 +85,32 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-
-    with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
-
-        with context.begin_transaction():
-            context.run_migrations()
+    for url in database_urls:
+        connectable = engine_from_config(
+            config.get_section(config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+            url=url,
+        )
+
+        with connectable.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                # Fail fast instead of queueing every query on the table
+                # behind a migration that is waiting for its lock.
+                connection.execute(
+                    text("SELECT set_config('lock_timeout', :timeout, false)"),
+                    {"timeout": settings.migration_lock_timeout},
+                )
+                connection.commit()
+
+            context.configure(
+                connection=connection,
+                **migration_options,
+                render_as_batch=connection.dialect.name == "sqlite",
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,27 @@
+"""Index otps.user_id
+
+Revision ID: 3f1c2a7d9b04
+Revises: 956c58b56b48
+Create Date: 2026-10-19 09:31:34.966662
+
+"""
+
+from typing import Sequence, Union
+
+from app.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a7d9b04"
+down_revision: Union[str, Sequence[str], None] = "956c58b56b48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently("ix_otps_user_id", "otps", ["user_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_otps_user_id", "otps")
@@ -0,0 +1,27 @@
+"""Index users.created_at
+
+Revision ID: 8b2e6f1a4c37
+Revises: 3f1c2a7d9b04
+Create Date: 2026-10-19 11:02:17.418230
+
+"""
+
+from typing import Sequence, Union
+
+from app.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2e6f1a4c37"
+down_revision: Union[str, Sequence[str], None] = "3f1c2a7d9b04"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently("ix_users_created_at", "users", ["created_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_users_created_at", "users")
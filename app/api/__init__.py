@@ -1 +1,3 @@
+from .admin import router as admin_router  # noqa: F401
+from .auth import IDEMPOTENT_PATHS  # noqa: F401
 from .auth import router as auth_router  # noqa: F401
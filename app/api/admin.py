@@ -0,0 +1,128 @@
+import heapq
+import io
+import secrets
+from operator import itemgetter
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Security,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from fastapi.security import APIKeyHeader
+
+from app.schemas import AdminUserDTO, UserImportResult, UserPage
+from app.settings import get_settings
+from app.sharding import ShardSessions, get_shards, shard_router
+from app.user_export import (
+    EXPORT_FORMATS,
+    EXPORT_MEDIA_TYPES,
+    stream_users,
+    user_listing_query,
+)
+from app.user_import import (
+    IMPORT_BATCH_SIZE,
+    MAX_IMPORT_BATCH_SIZE,
+    detect_format,
+    import_users,
+    send_verification_emails,
+)
+
+ADMIN_API_KEY = get_settings().admin_api_key
+MAX_PAGE_SIZE = 1000
+
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+
+
+def require_admin(api_key: str | None = Security(admin_key_header)):
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not api_key or not secrets.compare_digest(api_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+router = APIRouter(
+    prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)]
+)
+
+
+@router.post("/users/import", response_model=UserImportResult)
+def bulk_import_users(
+    file: UploadFile,
+    background_tasks: BackgroundTasks,
+    format: str | None = None,
+    send_verification: bool = False,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=MAX_IMPORT_BATCH_SIZE),
+    shards: ShardSessions = Depends(get_shards),
+):
+    try:
+        fmt = format or detect_format(file.filename)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        result = import_users(
+            shards,
+            stream,
+            fmt,
+            batch_size=batch_size,
+            send_verification=send_verification,
+        )
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        stream.detach()
+
+    if result.verification_emails:
+        background_tasks.add_task(send_verification_emails, result.verification_emails)
+
+    return UserImportResult(
+        inserted=result.inserted,
+        duplicates=result.duplicates,
+        invalid=result.invalid,
+        errors=result.errors,
+        verification_emails_queued=len(result.verification_emails),
+    )
+
+
+@router.get("/users", response_model=UserPage)
+def list_users(
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    shards: ShardSessions = Depends(get_shards),
+):
+    # Each shard contributes its first ``limit`` users past the cursor; the
+    # page is the ``limit`` smallest API ids among them.
+    rows = []
+    for shard in range(shard_router.shard_count):
+        db = shards.get(shard)
+        query = user_listing_query(shard_router.local_after_id(shard, after_id))
+        for row in db.execute(query.limit(limit)).mappings():
+            row = dict(row)
+            row["id"] = shard_router.encode_user_id(shard, row["id"])
+            rows.append(row)
+    rows = heapq.nsmallest(limit, rows, key=itemgetter("id"))
+    items = [AdminUserDTO.model_validate(row) for row in rows]
+    return UserPage(
+        items=items,
+        next_after_id=items[-1].id if len(items) == limit else None,
+    )
+
+
+@router.get("/users/export")
+def export_users(format: str = "csv", after_id: int = Query(0, ge=0)):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of {', '.join(EXPORT_FORMATS)}",
+        )
+    return StreamingResponse(
+        stream_users(format, after_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
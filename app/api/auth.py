@@ -4,88 +4,133 @@ from fastapi.security import (
     HTTPBearer,
     OAuth2PasswordBearer,  # noqa: F401
 )
-import jwt
 from pydantic import EmailStr
-from sqlalchemy import select, update
+from sqlalchemy import or_, select, update
 from sqlalchemy.orm import Session
 
 from app.auth_utils import (
-    ALGORITHM,
-    SECRET_KEY,
     create_access_token,
+    decode_access_token,
     generate_otp,
     hash_password,
+    verify_dummy_password,
     verify_otp,
     verify_password,
 )
-from app.db import get_db
-from app.email_handler import EmailHandler, EmailType
+from app.db import insert_ignoring_conflicts
+from app.email_filter import known_emails
+from app.email_handler import EmailType, get_async_email_handler
 from app.models import User, UserOTP
 from app.schemas import (
     ForgotPasswordRequest,
     GetUserDTO,
+    MessageResponse,
     ResetPasswordRequest,
+    TokenResponse,
     UserLoginDTO,
     UserOTPVerify,
     UserRegisterDTO,
 )
+from app.sharding import (
+    ShardSessions,
+    claim_usernames,
+    get_shards,
+    release_usernames,
+    shard_router,
+)
 from app.utils import get_expiration_time
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 # oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login", refreshUrl="/user/refresh_token")
 http_bearer = HTTPBearer()
 
+# Routes that honour an Idempotency-Key header (see app.idempotency).
+IDEMPOTENT_PATHS = {
+    f"{router.prefix}/register",
+    f"{router.prefix}/request-otp",
+    f"{router.prefix}/forgot-password",
+}
+
 
 @router.post("/register", response_model=GetUserDTO)
 async def register(
     user: UserRegisterDTO,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    shards: ShardSessions = Depends(get_shards),
 ):
+    owned, claimed = claim_usernames(shards, {user.username: user.email})
+    if not owned:
+        raise HTTPException(status_code=400, detail="Username already exists")
+
+    # Uniqueness is enforced by the insert itself (and, with sharding, by the
+    # username claim), so concurrent signups for the same email or username
+    # cannot both succeed.
+    db = shards.for_email(user.email)
     stmt = (
-        select(User)
-        .where(User.email == user.email)
-        .where(User.username == user.username)
-    )
-    if db.scalars(stmt).first():
-        raise HTTPException(status_code=400, detail="Email or username already exists")
-
-    with db.begin():
-        new_user = User(
+        insert_ignoring_conflicts(db, User)
+        .values(
             email=user.email,
             username=user.username,
             password=hash_password(user.password),
         )
-        db.add(new_user)
-        db.flush()  # Flush to get the ID without committing
-
-        # Generate OTP
-        expiry_in_minutes = 10
-        otp = UserOTP()
-        otp.otp = generate_otp()
-        otp.expiration = get_expiration_time(after_minutes=expiry_in_minutes)
-        otp.user_id = new_user.id
-
-        db.add(otp)
+        .returning(User.id, User.email, User.username)
+    )
+    new_user = db.execute(stmt).mappings().first()
+    if new_user is None:
+        db.rollback()
+        release_usernames(shards, claimed)
+        raise HTTPException(status_code=400, detail=registration_conflict(db, user))
 
-    db.refresh(new_user)
-    db.refresh(otp)
+    # Generate OTP; codes are unique, so one another user holds is redrawn.
+    expiry_in_minutes = 10
+    otp = None
+    while otp is None:
+        stmt = (
+            insert_ignoring_conflicts(db, UserOTP)
+            .values(
+                otp=generate_otp(),
+                expiration=get_expiration_time(after_minutes=expiry_in_minutes),
+                user_id=new_user["id"],
+            )
+            .returning(UserOTP.otp)
+        )
+        otp = db.execute(stmt).scalar()
+    db.commit()
+    known_emails.add(new_user["email"])
 
-    email_handler = EmailHandler()
+    email_handler = get_async_email_handler()
     background_tasks.add_task(
         email_handler.send_email,
         receiver=user.email,
         email_type=EmailType.OTP,
-        otp=otp.otp,
+        otp=otp,
         valid_time=f"{expiry_in_minutes} minutes",
         username=user.username,
     )
 
-    return new_user
+    return GetUserDTO(
+        id=shard_router.encode_user_id(db.info["shard"], new_user["id"]),
+        email=new_user["email"],
+        username=new_user["username"],
+    )
 
 
-@router.post("/verify")
-async def verify(data: UserOTPVerify, db: Session = Depends(get_db)):
+def registration_conflict(db: Session, user: UserRegisterDTO) -> str:
+    """Work out which unique field a rejected registration collided on."""
+    stmt = select(User.email, User.username).where(
+        or_(User.email == user.email, User.username == user.username)
+    )
+    existing = db.execute(stmt).all()
+    if any(row.email == user.email for row in existing):
+        return "Email already exists"
+    if any(row.username == user.username for row in existing):
+        return "Username already exists"
+    return "Email or username already exists"
+
+
+@router.post("/verify", response_model=TokenResponse)
+async def verify(data: UserOTPVerify, shards: ShardSessions = Depends(get_shards)):
+    db = shards.for_email(data.email)
     stmt = select(User).where(User.email == data.email)
     current_user = db.scalars(stmt).first()
     if not current_user:
@@ -99,19 +144,26 @@ async def verify(data: UserOTPVerify, db: Session = Depends(get_db)):
         current_otp.used = True
         current_user.verified = True
     db.refresh(current_user)
-    token_data = {"sub": str(current_user.id)}
+    token_data = {"sub": str(shard_router.user_id(current_user))}
     token = create_access_token(token_data)
-    return {"access_token": token, "token_type": "bearer"}
+    return TokenResponse(access_token=token)
 
 
-@router.post("/request-otp")
+@router.post("/request-otp", response_model=MessageResponse)
 def request_otp(
-    email: EmailStr, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
+    email: EmailStr,
+    background_tasks: BackgroundTasks,
+    shards: ShardSessions = Depends(get_shards),
 ):
+    # No known-email shortcut here: answering a filter miss without the
+    # query would make unknown emails measurably faster than known ones.
+    db = shards.for_email(email)
     stmt = select(User).where(User.email == email)
     current_user = db.scalars(stmt).first()
     if not current_user:
-        return {"message": "If the email exists, a password reset code has been sent."}
+        return MessageResponse(
+            message="If the email exists, a password reset code has been sent."
+        )
 
     expiry_in_minutes = 10
     otp = generate_otp()
@@ -124,7 +176,7 @@ def request_otp(
     db.commit()
     db.refresh(current_user)
 
-    email_handler = EmailHandler()
+    email_handler = get_async_email_handler()
     background_tasks.add_task(
         email_handler.send_email,
         receiver=current_user.email,
@@ -133,32 +185,42 @@ def request_otp(
         valid_time=f"{expiry_in_minutes} minutes",
         username=current_user.username,
     )
-    return {"message": "OTP sent"}
+    return MessageResponse(message="OTP sent")
 
 
-@router.post("/login")
-async def login(user: UserLoginDTO, db: Session = Depends(get_db)):
+@router.post("/login", response_model=TokenResponse)
+async def login(user: UserLoginDTO, shards: ShardSessions = Depends(get_shards)):
+    # Unknown emails still pay for a password check, so response times do
+    # not reveal whether an account exists.
+    if known_emails.rules_out(user.email):
+        verify_dummy_password(user.password)
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    db = shards.for_email(user.email)
     stmt = select(User).where(User.email == user.email)
     current_user = db.scalars(stmt).first()
-    if not current_user or not verify_password(user.password, current_user.password):
+    if not current_user:
+        verify_dummy_password(user.password)
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not verify_password(user.password, current_user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     if not current_user.verified:
         raise HTTPException(status_code=403, detail="User not verified")
-    token_data = {"sub": str(current_user.id)}
+    token_data = {"sub": str(shard_router.user_id(current_user))}
     token = create_access_token(token_data)
-    return {"access_token": token, "token_type": "bearer"}
+    return TokenResponse(access_token=token)
 
 
 async def get_current_user(
-    db: Session = Depends(get_db),
+    shards: ShardSessions = Depends(get_shards),
     # token: str = Depends(oauth2_scheme)
     credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
 ):
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
+        payload = decode_access_token(token)
+        db, user_id = shards.for_user_id(int(payload.get("sub")))
         stmt = select(User).where(User.id == user_id)
         current_user = db.scalars(stmt).first()
         if not current_user:
@@ -169,16 +231,20 @@ async def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", response_model=MessageResponse)
 async def forgot_password(
     request: ForgotPasswordRequest,
     bg_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    shards: ShardSessions = Depends(get_shards),
 ):
+    # Always query, as in request_otp, so timing does not reveal the answer.
+    db = shards.for_email(request.email)
     stmt = select(User).where(User.email == request.email)
     current_user = db.scalars(stmt).first()
     if not current_user:
-        return {"message": "If the email exists, a password reset code has been sent."}
+        return MessageResponse(
+            message="If the email exists, a password reset code has been sent."
+        )
 
     if not current_user.verified:
         raise HTTPException(status_code=403, detail="User not verified")
@@ -194,7 +260,7 @@ async def forgot_password(
     db.execute(stmt)
     db.commit()
 
-    email_handler = EmailHandler()
+    email_handler = get_async_email_handler()
     bg_tasks.add_task(
         func=email_handler.send_email,
         receiver=current_user.email,
@@ -204,11 +270,16 @@ async def forgot_password(
         username=current_user.username,
     )
 
-    return {"message": "If the email exists, a password reset code has been sent."}
+    return MessageResponse(
+        message="If the email exists, a password reset code has been sent."
+    )
 
 
-@router.post("/reset-password")
-async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+@router.post("/reset-password", response_model=MessageResponse)
+async def reset_password(
+    request: ResetPasswordRequest, shards: ShardSessions = Depends(get_shards)
+):
+    db = shards.for_email(request.email)
     stmt = select(User).where(User.email == request.email)
     current_user = db.scalars(stmt).first()
     if not current_user:
@@ -229,16 +300,20 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
     db.commit()
     db.refresh(current_user)
 
-    return {"message": "Password reset successfully"}
+    return MessageResponse(message="Password reset successfully")
 
 
 @router.get("/me", response_model=GetUserDTO)
 async def get_user(current_user: User = Depends(get_current_user)):
-    return current_user
+    return GetUserDTO(
+        id=shard_router.user_id(current_user),
+        email=current_user.email,
+        username=current_user.username,
+    )
 
 
-@router.get("/refresh_token")
+@router.get("/refresh_token", response_model=TokenResponse)
 async def refresh_token(current_user: User = Depends(get_current_user)):
-    token_data = {"sub": current_user.id}
+    token_data = {"sub": str(shard_router.user_id(current_user))}
     token = create_access_token(token_data)
-    return {"access_token": token, "token_type": "bearer"}
+    return TokenResponse(access_token=token)
@@ -1,18 +1,22 @@
 import datetime
-import os
+import hashlib
 import random
+from functools import lru_cache
 
 import argon2
-from dotenv import load_dotenv
 import jwt
+from sqlalchemy import make_url
 
 from app.models.auth.Userotp import UserOTP
+from app.settings import get_settings
 from app.utils import get_expiration_time
 
-load_dotenv()
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-SECRET_KEY = os.getenv("SECRET_KEY", "thisisalongandrandomsecretkeyforthisstupidapp")
-ACCESS_TOKEN_EXPIRE_MINUTES = float(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+settings = get_settings()
+ALGORITHM = settings.algorithm
+SECRET_KEY = settings.secret_key
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+# Token claim naming the shard layout the token's ``sub`` was issued under.
+SHARD_LAYOUT_CLAIM = "shl"
 
 ph = argon2.PasswordHasher()
 
@@ -21,6 +25,26 @@ def hash_password(password: str) -> str:
     return ph.hash(password)
 
 
+@lru_cache
+def _dummy_password_hash() -> str:
+    return hash_password("dummy-password-for-unknown-users")
+
+
+def verify_dummy_password(plain: str) -> bool:
+    """Spend the same time as ``verify_password`` for a user that does not exist.
+
+    Keeps failed logins for unknown emails indistinguishable by timing from
+    failed logins for known ones.
+    """
+    verify_password(plain, _dummy_password_hash())
+    return False
+
+
+def warm_up_hasher() -> None:
+    """Pay Argon2's first-use memory allocation before serving traffic."""
+    verify_dummy_password("warm-up")
+
+
 def verify_password(plain: str, hashed: str) -> bool:
     try:
         ph.verify(hashed, plain)
@@ -29,13 +53,44 @@ def verify_password(plain: str, hashed: str) -> bool:
         return False
 
 
+def _shard_layout() -> str:
+    """Fingerprint of how user ids map to databases.
+
+    User ids encode their shard, so the same id names a different user once
+    SHARD_DATABASE_URLS changes. The fingerprint covers the ordered shard
+    URLs (without passwords) and SHARD_EPOCH, which can be bumped to
+    invalidate every token by hand.
+    """
+    urls = [
+        make_url(url).render_as_string(hide_password=True)
+        for url in settings.shard_database_urls
+    ]
+    layout = "\n".join([str(settings.shard_epoch), *urls])
+    return hashlib.blake2b(layout.encode(), digest_size=8).hexdigest()
+
+
+SHARD_LAYOUT = _shard_layout()
+
+
 def create_access_token(data: dict, minutes_ttl: float = ACCESS_TOKEN_EXPIRE_MINUTES):
     to_encode = data.copy()
     expire = get_expiration_time(minutes_ttl)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, SHARD_LAYOUT_CLAIM: SHARD_LAYOUT})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def decode_access_token(token: str) -> dict:
+    """Verify ``token`` and return its payload.
+
+    Raises ``jwt.InvalidTokenError`` for bad or expired tokens and for
+    tokens issued under a different shard layout.
+    """
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if payload.get(SHARD_LAYOUT_CLAIM) != SHARD_LAYOUT:
+        raise jwt.InvalidTokenError("Token was issued for another shard layout")
+    return payload
+
+
 def generate_otp(digits: int = 8) -> int:
     return random.randint(10 ** (digits - 1), 10**digits - 1)
 
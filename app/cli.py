@@ -0,0 +1,141 @@
+"""Management commands.
+
+Usage::
+
+    python -m app.cli import-users users.csv --send-verification
+    python -m app.cli reshard --to sqlite:///shard0.db --to sqlite:///shard1.db
+"""
+
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import make_url
+
+from app.sharding import (
+    RESHARD_BATCH_SIZE,
+    ShardRouter,
+    ShardSessions,
+    reshard_users,
+    shard_router,
+)
+from app.user_import import (
+    HASH_POOL_WORKERS,
+    IMPORT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    create_hash_pool,
+    detect_format,
+    import_users,
+    send_verification_emails,
+)
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def import_users_command(args: argparse.Namespace) -> int:
+    try:
+        fmt = args.format or detect_format(args.path)
+    except ValueError as exc:
+        args.parser.error(f"{exc}; pass --format")
+    with (
+        open(args.path, encoding="utf-8-sig", newline="") as stream,
+        ShardSessions(shard_router) as shards,
+        create_hash_pool(args.hash_workers) as pool,
+    ):
+        result = import_users(
+            shards,
+            stream,
+            fmt,
+            batch_size=args.batch_size,
+            pool=pool,
+            hash_workers=args.hash_workers,
+            send_verification=args.send_verification,
+        )
+
+    print(
+        f"inserted={result.inserted} duplicates={result.duplicates} "
+        f"invalid={result.invalid}"
+    )
+    for error in result.errors:
+        print(error, file=sys.stderr)
+
+    if result.verification_emails:
+        failures = asyncio.run(send_verification_emails(result.verification_emails))
+        print(
+            f"verification_emails_sent={len(result.verification_emails) - failures} "
+            f"failed={failures}"
+        )
+    return 0
+
+
+def reshard_command(args: argparse.Namespace) -> int:
+    sources = {
+        engine.url.render_as_string(hide_password=False)
+        for engine in shard_router.engines
+    }
+    targets = {make_url(url).render_as_string(hide_password=False) for url in args.to}
+    if sources & targets:
+        print("Target databases must not include a current shard.", file=sys.stderr)
+        return 1
+
+    copied = reshard_users(shard_router, ShardRouter(tuple(args.to)), args.batch_size)
+    print(f"copied={copied}")
+    print(
+        "Set SHARD_DATABASE_URLS to the new databases to switch over. "
+        "User ids change; tokens issued before the switch are rejected.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import-users", help="Bulk import users from a CSV or JSONL file."
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS)
+    import_parser.add_argument(
+        "--batch-size", type=positive_int, default=IMPORT_BATCH_SIZE
+    )
+    import_parser.add_argument(
+        "--hash-workers",
+        type=positive_int,
+        default=HASH_POOL_WORKERS,
+        help="Password hashing processes (defaults to HASH_POOL_WORKERS, "
+        "else the CPU count).",
+    )
+    import_parser.add_argument("--send-verification", action="store_true")
+    import_parser.set_defaults(handler=import_users_command, parser=import_parser)
+
+    reshard_parser = commands.add_parser(
+        "reshard",
+        help="Copy all users into a new set of shard databases.",
+        description="Target databases must already have the schema "
+        "(SHARD_DATABASE_URLS=<targets> alembic upgrade head).",
+    )
+    reshard_parser.add_argument(
+        "--to",
+        action="append",
+        required=True,
+        metavar="URL",
+        help="Target shard database, in shard order; repeat for each shard.",
+    )
+    reshard_parser.add_argument(
+        "--batch-size", type=positive_int, default=RESHARD_BATCH_SIZE
+    )
+    reshard_parser.set_defaults(handler=reshard_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,41 @@
-import os
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
+from contextlib import ExitStack
+from sqlalchemy import Engine, create_engine, make_url
+from sqlalchemy.orm import Session as SessionType
 from sqlalchemy.orm import sessionmaker
 
+from app.settings import get_settings
 
-load_dotenv()
-database_url = os.getenv("DATABASE_URL", "sqlite:///url_shortener.db")
-engine = create_engine(database_url)
+settings = get_settings()
+database_url = settings.database_url
+
+# Per-process pool limits; the production launcher divides the database's
+# connection budget between its workers through these.
+engine_options = {}
+if settings.db_pool_size is not None:
+    engine_options["pool_size"] = settings.db_pool_size
+if settings.db_max_overflow is not None:
+    engine_options["max_overflow"] = settings.db_max_overflow
+
+# The bulk paths rely on INSERT ... ON CONFLICT (see insert_ignoring_conflicts).
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+
+def create_app_engine(url: str) -> Engine:
+    """Create an engine for one of the app's databases.
+
+    Refuses backends outside ``SUPPORTED_DIALECTS`` up front rather than
+    on the first registration or import.
+    """
+    backend = make_url(url).get_backend_name()
+    if backend not in SUPPORTED_DIALECTS:
+        raise ValueError(
+            f"Unsupported database backend {backend!r}; "
+            f"expected one of {', '.join(SUPPORTED_DIALECTS)}"
+        )
+    return create_engine(url, **engine_options)
+
+
+engine = create_app_engine(database_url)
 
 
 Session = sessionmaker(bind=engine)
@@ -18,3 +47,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def insert_ignoring_conflicts(db: SessionType, model):
+    """Build an ``INSERT ... ON CONFLICT DO NOTHING`` for the session's dialect.
+
+    Rows that would violate a unique constraint are skipped instead of
+    aborting the statement; use ``.returning()`` to see which rows landed.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        # create_app_engine() only accepts SUPPORTED_DIALECTS.
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).on_conflict_do_nothing()
+
+
+def warm_up_pool(target: Engine = engine) -> int:
+    """Open the pool's steady-state connections up front.
+
+    Connections are held simultaneously so the pool ends up with
+    ``pool_size`` distinct connections ready for the first requests.
+    Returns the number of connections opened.
+    """
+    size = target.pool.size() if hasattr(target.pool, "size") else 1
+    with ExitStack() as stack:
+        for _ in range(size):
+            stack.enter_context(target.connect())
+    return size
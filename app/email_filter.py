@@ -0,0 +1,198 @@
+"""In-memory membership filter over registered emails.
+
+``known_emails`` is a Bloom filter of the emails in ``users`` (on every
+shard). A miss can only be trusted when the filter sees every write, and this
+one does not: it is per process, built at startup and updated in-process on
+registration and import, so users created elsewhere (another worker, the CLI
+importer, a manual insert) stay invisible until the next refresh. Callers
+therefore ask ``rules_out``, which is false for a per-process filter, and
+fall back to the database on a miss; a filter backed by a store every writer
+updates can set ``covers_all_writes`` to let them skip it.
+
+Each refresh, every ``EMAIL_FILTER_REFRESH_SECONDS``, re-reads users created
+in the last ``EMAIL_FILTER_REFRESH_LOOKBACK_SECONDS`` before the previous
+refresh, which covers rows that commit out of id order (concurrent signups,
+long import batches) as long as their transaction finishes within that
+window. Rows without ``created_at`` are only seen by the full rebuild every
+``EMAIL_FILTER_REBUILD_SECONDS``. Until the first build completes every email
+is treated as possibly registered.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+
+from app.models import User
+from app.settings import get_settings
+from app.sharding import shard_router
+from app.utils import get_time, normalize_email
+
+logger = logging.getLogger(__name__)
+
+BUILD_BATCH_ROWS = 10_000
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class KnownEmailFilter:
+    # Whether every write that creates a user also updates this filter, so
+    # that a miss proves the email is unregistered. Never true for the
+    # per-process filter.
+    covers_all_writes = False
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        enabled: bool = True,
+        refresh_lookback_seconds: int = 60,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.enabled = enabled
+        self.refresh_lookback = timedelta(seconds=refresh_lookback_seconds)
+        self._filter: BloomFilter | None = None
+        self._building: BloomFilter | None = None
+        # When the last build or refresh started reading.
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_exist(self, email: str) -> bool:
+        """``False`` if the filter has certainly never seen ``email``."""
+        if not self.enabled or self._filter is None:
+            return True
+        return normalize_email(email) in self._filter
+
+    def rules_out(self, email: str) -> bool:
+        """``True`` only if a lookup for ``email`` can be skipped."""
+        return self.covers_all_writes and not self.might_exist(email)
+
+    def add(self, email: str) -> None:
+        email = normalize_email(email)
+        with self._lock:
+            for bloom in (self._filter, self._building):
+                if bloom is not None:
+                    bloom.add(email)
+
+    def rebuild(self) -> int:
+        """Build a fresh filter from the users tables and swap it in.
+
+        Returns the number of emails loaded.
+        """
+        started_at = get_time()
+        count = 0
+        for shard in range(shard_router.shard_count):
+            with shard_router.session(shard) as db:
+                count += db.scalar(select(func.count(User.id)))
+        bloom = BloomFilter(max(self.capacity, 2 * count), self.error_rate)
+        with self._lock:
+            self._building = bloom
+
+        loaded = 0
+        try:
+            for shard in range(shard_router.shard_count):
+                with shard_router.session(shard) as db:
+                    emails = db.scalars(
+                        select(User.email).execution_options(yield_per=BUILD_BATCH_ROWS)
+                    )
+                    for email in emails:
+                        bloom.add(normalize_email(email))
+                        loaded += 1
+        except BaseException:
+            with self._lock:
+                self._building = None
+            raise
+
+        with self._lock:
+            self._filter = bloom
+            self._building = None
+            self._refreshed_at = started_at
+        return loaded
+
+    def refresh(self) -> int:
+        """Add users created since the last build or refresh.
+
+        Returns the number of emails read, including ones re-read from the
+        lookback window.
+        """
+        if self._filter is None:
+            return 0
+        started_at = get_time()
+        since = self._refreshed_at - self.refresh_lookback
+        read = 0
+        for shard in range(shard_router.shard_count):
+            with shard_router.session(shard) as db:
+                emails = db.scalars(
+                    select(User.email).where(User.created_at >= since)
+                ).all()
+            for email in emails:
+                self.add(email)
+            read += len(emails)
+        self._refreshed_at = started_at
+        return read
+
+
+async def maintain_known_emails(
+    email_filter: "KnownEmailFilter", refresh_seconds: int, rebuild_seconds: int
+) -> None:
+    """Build the filter, then keep it current until cancelled."""
+    last_rebuild = None
+    while True:
+        try:
+            if (
+                last_rebuild is None
+                or time.monotonic() - last_rebuild >= rebuild_seconds
+            ):
+                loaded = await run_in_threadpool(email_filter.rebuild)
+                last_rebuild = time.monotonic()
+                logger.info("Known-email filter built with %d emails", loaded)
+            else:
+                await run_in_threadpool(email_filter.refresh)
+        except Exception:
+            logger.exception("Failed to update the known-email filter")
+        await asyncio.sleep(refresh_seconds)
+
+
+settings = get_settings()
+known_emails = KnownEmailFilter(
+    capacity=settings.email_filter_capacity,
+    error_rate=settings.email_filter_error_rate,
+    enabled=settings.email_filter_enabled,
+    refresh_lookback_seconds=settings.email_filter_refresh_lookback_seconds,
+)
@@ -1,8 +1,43 @@
+from functools import lru_cache
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from .decorators import register_template  # noqa: F401
-from .email_handler import EmailHandler  # noqa: F401
 from .email_types import EmailType  # noqa: F401
 from .template_registry import TemplateRegistry  # noqa: F401
 from .template_utils import (  # noqa: F401
     list_registered_templates,
     validate_template_args,
 )
+
+if TYPE_CHECKING:
+    from .async_email_handler import (  # noqa: F401
+        AsyncEmailHandler,
+        AsyncSMTPError,
+        Delivery,
+    )
+    from .email_handler import EmailHandler  # noqa: F401
+
+# The SMTP clients pull in smtplib/ssl; load them on first access.
+_LAZY_EXPORTS = {
+    "AsyncEmailHandler": ".async_email_handler",
+    "AsyncSMTPError": ".async_email_handler",
+    "Delivery": ".async_email_handler",
+    "EmailHandler": ".email_handler",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+@lru_cache
+def get_async_email_handler() -> "AsyncEmailHandler":
+    """Create the shared ``AsyncEmailHandler`` on first use."""
+    from .async_email_handler import AsyncEmailHandler
+
+    return AsyncEmailHandler()
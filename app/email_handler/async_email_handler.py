@@ -0,0 +1,330 @@
+import asyncio
+import base64
+import email.policy
+import ssl
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from email.utils import getaddresses
+
+from pydantic import EmailStr
+
+from .email_handler import build_message, get_smtp_settings
+from .email_types import EmailType
+
+SMTP_TIMEOUT = 30.0
+
+
+class AsyncSMTPError(Exception):
+    """Raised when the SMTP server rejects a command."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+
+@dataclass
+class Delivery:
+    """Outcome of sending one message.
+
+    ``error`` is set when nobody received the message. ``refused`` maps each
+    recipient the server turned down to its reply, including when the
+    message was still delivered to the others.
+    """
+
+    message: EmailMessage
+    error: AsyncSMTPError | None = None
+    refused: dict[str, AsyncSMTPError] = field(default_factory=dict)
+
+
+class AsyncSMTPClient:
+    """A small ESMTP client built on asyncio streams.
+
+    Supports STARTTLS, AUTH PLAIN/LOGIN and RFC 2920 pipelining, so that a
+    batch of messages can be delivered over a single connection without
+    waiting for a round trip after every command.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.extensions: dict[str, str] = {}
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def __aenter__(self) -> "AsyncSMTPClient":
+        if self._writer is None:
+            await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            # Cancelled: don't wait on the server.
+            self.close()
+        else:
+            await self.quit()
+
+    async def connect(self) -> None:
+        async with asyncio.timeout(self.timeout):
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            await self._expect(220)
+            await self.ehlo()
+
+    async def ehlo(self) -> None:
+        self._write(b"EHLO localhost")
+        _, lines = await self._expect(250)
+        self.extensions = {}
+        for line in lines[1:]:
+            keyword, _, params = line.partition(" ")
+            self.extensions[keyword.upper()] = params
+
+    async def starttls(self) -> None:
+        async with asyncio.timeout(self.timeout):
+            self._write(b"STARTTLS")
+            await self._expect(220)
+            await self._writer.start_tls(
+                ssl.create_default_context(), server_hostname=self.host
+            )
+            await self.ehlo()
+
+    async def login(self, user: str, password: str) -> None:
+        mechanisms = self.extensions.get("AUTH", "").upper().split()
+        async with asyncio.timeout(self.timeout):
+            if "PLAIN" in mechanisms or "LOGIN" not in mechanisms:
+                token = _b64(f"\0{user}\0{password}")
+                self._write(f"AUTH PLAIN {token}".encode())
+            else:
+                self._write(b"AUTH LOGIN")
+                await self._expect(334)
+                self._write(_b64(user).encode())
+                await self._expect(334)
+                self._write(_b64(password).encode())
+            await self._expect(235)
+
+    async def send_messages(self, messages: Iterable[EmailMessage]) -> list[Delivery]:
+        """Deliver ``messages`` over this connection.
+
+        Returns one ``Delivery`` per message. A message goes out as long as
+        the server accepts at least one of its recipients. When the server
+        supports PIPELINING the envelope commands of each message are sent
+        in one write and the final reply of a message is read together with
+        the envelope replies of the next one.
+        """
+        pipelining = "PIPELINING" in self.extensions
+        results = []
+        pending: Delivery | None = None
+
+        loop = asyncio.get_running_loop()
+
+        async with asyncio.timeout(None) as deadline:
+            for message in messages:
+                # The timeout applies to each message, not the whole batch.
+                deadline.reschedule(loop.time() + self.timeout)
+                sender, recipients = _envelope(message)
+                commands = [f"MAIL FROM:<{sender}>".encode()]
+                commands += [f"RCPT TO:<{rcpt}>".encode() for rcpt in recipients]
+                commands.append(b"DATA")
+                expected = [(250,)] + [(250, 251)] * len(recipients) + [(354,)]
+
+                if pipelining:
+                    for command in commands:
+                        self._write(command)
+                    if pending is not None:
+                        pending.error = await self._check(250)
+                        results.append(pending)
+                        pending = None
+                    replies = [await self._check(*codes) for codes in expected]
+                else:
+                    replies = []
+                    for command, codes in zip(commands, expected):
+                        self._write(command)
+                        replies.append(await self._check(*codes))
+
+                delivery = Delivery(
+                    message,
+                    refused={
+                        rcpt: reply
+                        for rcpt, reply in zip(recipients, replies[1:-1])
+                        if reply is not None
+                    },
+                )
+                if replies[0] is not None:
+                    delivery.error = replies[0]
+                elif len(delivery.refused) == len(recipients):
+                    delivery.error = next(
+                        iter(delivery.refused.values()),
+                        AsyncSMTPError(554, "No recipients"),
+                    )
+                data_error = replies[-1]
+
+                if data_error is None:
+                    if delivery.error is None:
+                        self._writer.write(_encode_body(message))
+                        pending = delivery
+                    else:
+                        # Some servers answer DATA even after a rejected
+                        # envelope; send an empty body to get back in sync.
+                        self._writer.write(b".\r\n")
+                        await self._check(250)
+                if pending is None:
+                    self._write(b"RSET")
+                    await self._check(250)
+                    delivery.error = delivery.error or data_error
+                    results.append(delivery)
+                elif not pipelining:
+                    pending.error = await self._check(250)
+                    results.append(pending)
+                    pending = None
+
+            if pending is not None:
+                deadline.reschedule(loop.time() + self.timeout)
+                pending.error = await self._check(250)
+                results.append(pending)
+        return results
+
+    async def quit(self) -> None:
+        if self._writer is None:
+            return
+        try:
+            self._write(b"QUIT")
+            await self._writer.drain()
+            self._writer.close()
+            await self._writer.wait_closed()
+        except (ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            self._reader = self._writer = None
+
+    def close(self) -> None:
+        """Drop the connection without saying goodbye to the server."""
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    def _write(self, line: bytes) -> None:
+        self._writer.write(line + b"\r\n")
+
+    async def _read_reply(self) -> tuple[int, list[str]]:
+        await self._writer.drain()
+        lines = []
+        while True:
+            raw = await self._reader.readline()
+            if not raw:
+                raise ConnectionError("SMTP server closed the connection")
+            line = raw.decode(errors="replace").rstrip("\r\n")
+            lines.append(line[4:])
+            if line[3:4] != "-":
+                return int(line[:3]), lines
+
+    async def _check(self, *expected: int) -> AsyncSMTPError | None:
+        code, lines = await self._read_reply()
+        if code not in expected:
+            return AsyncSMTPError(code, " ".join(lines))
+        return None
+
+    async def _expect(self, *expected: int) -> tuple[int, list[str]]:
+        code, lines = await self._read_reply()
+        if code not in expected:
+            raise AsyncSMTPError(code, " ".join(lines))
+        return code, lines
+
+
+class AsyncEmailHandler:
+    """Asyncio counterpart of ``EmailHandler``.
+
+    Sending does not block a threadpool worker, so it can be scheduled as an
+    async background task. ``send_many`` delivers a batch of emails over one
+    pipelined connection.
+    """
+
+    def __init__(self):
+        settings = get_smtp_settings()
+        self.sender_email = settings.sender_email
+        self.smtp_host = settings.smtp_host
+        self.smtp_port = settings.smtp_port
+        self.smtp_user = settings.smtp_user
+        self.smtp_password = settings.smtp_password
+        self.smtp_starttls = settings.smtp_starttls
+
+    def build_message(
+        self, receiver: EmailStr, email_type: EmailType, **kwargs
+    ) -> EmailMessage:
+        return build_message(self.sender_email, receiver, email_type, **kwargs)
+
+    async def connect(self) -> AsyncSMTPClient:
+        """Open an authenticated connection to the configured SMTP relay."""
+        client = AsyncSMTPClient(self.smtp_host, self.smtp_port)
+        try:
+            await client.connect()
+            if self.smtp_starttls:
+                await client.starttls()
+            await client.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            await client.quit()
+            raise
+        except BaseException:
+            client.close()
+            raise
+        return client
+
+    async def send_email(self, receiver: EmailStr, email_type: EmailType, **kwargs):
+        message = self.build_message(receiver, email_type, **kwargs)
+
+        async with await self.connect() as client:
+            [delivery] = await client.send_messages([message])
+        if delivery.error is not None:
+            raise delivery.error
+
+    async def send_many(
+        self, emails: Iterable[tuple[EmailStr, EmailType, dict]]
+    ) -> list[tuple[EmailStr, AsyncSMTPError]]:
+        """Send ``(receiver, email_type, kwargs)`` triples over one connection.
+
+        Returns the receivers the server rejected along with the error: every
+        receiver of a message that was not delivered, and the refused ones of
+        a message that reached the others.
+        """
+        messages = [
+            self.build_message(receiver, email_type, **kwargs)
+            for receiver, email_type, kwargs in emails
+        ]
+        if not messages:
+            return []
+
+        async with await self.connect() as client:
+            deliveries = await client.send_messages(messages)
+        rejected = []
+        for delivery in deliveries:
+            if delivery.error is not None:
+                rejected.append((delivery.message["To"], delivery.error))
+            else:
+                rejected.extend(delivery.refused.items())
+        return rejected
+
+
+def _b64(value: str) -> str:
+    return base64.b64encode(value.encode()).decode()
+
+
+def _envelope(message: EmailMessage) -> tuple[str, list[str]]:
+    _, sender = getaddresses([message["From"]])[0]
+    recipients = [
+        address
+        for _, address in getaddresses(
+            message.get_all("To", []) + message.get_all("Cc", [])
+        )
+    ]
+    return sender, recipients
+
+
+def _encode_body(message: EmailMessage) -> bytes:
+    body = message.as_bytes(policy=email.policy.SMTP)
+    if not body.endswith(b"\r\n"):
+        body += b"\r\n"
+    if body.startswith(b"."):
+        body = b"." + body
+    return body.replace(b"\r\n.", b"\r\n..") + b".\r\n"
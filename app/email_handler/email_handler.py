@@ -1,47 +1,79 @@
-import os
 import smtplib
 from email.message import EmailMessage
 
-from dotenv import load_dotenv
 from pydantic import EmailStr
 
+from app.settings import Settings, get_settings
+
 from .email_types import EmailType
 from .template_registry import TemplateRegistry
 
-load_dotenv()
 
-SMTP_HOST = os.environ.get("SMTP_HOST")
-SMTP_PORT = os.environ.get("SMTP_PORT")
-SMTP_USER = os.environ.get("SMTP_USER")
-SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
-SENDER_EMAIL = os.environ.get("SENDER_EMAIL")
+def get_smtp_settings() -> Settings:
+    """Return the settings after checking every SMTP option is present.
+
+    Checked when a handler is created rather than at import time, so the app
+    can be imported (by tools, tests, migrations) without mail configured.
+    """
+    settings = get_settings()
+    if not all(
+        [
+            settings.smtp_host,
+            settings.smtp_port,
+            settings.smtp_user,
+            settings.smtp_password,
+            settings.sender_email,
+        ]
+    ):
+        raise ValueError(
+            "One or more required environment variables for email are missing or empty."
+        )
+    return settings
 
-if not all([SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SENDER_EMAIL]):
-    raise ValueError(
-        "One or more required environment variables for email are missing or empty."
-    )
 
-SMTP_PORT = int(SMTP_PORT)
+def build_message(
+    sender: str, receiver: EmailStr, email_type: EmailType, **kwargs
+) -> EmailMessage:
+    """Render the template for ``email_type`` into a ready-to-send message."""
+    template = TemplateRegistry.create_template(email_type, **kwargs)
+
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = receiver
+    message["Subject"] = template.subject
+    message.set_content(template.html, "html")
+    return message
 
 
 class EmailHandler:
     def __init__(self):
-        self.sender_email = SENDER_EMAIL
-        self.smtp_host = SMTP_HOST
-        self.smtp_port = SMTP_PORT
-        self.smtp_user = SMTP_USER
-        self.smtp_password = SMTP_PASSWORD
-
-    def send_email(self, receiver: EmailStr, email_type: EmailType, **kwargs):
-        template = TemplateRegistry.create_template(email_type, **kwargs)
+        settings = get_smtp_settings()
+        self.sender_email = settings.sender_email
+        self.smtp_host = settings.smtp_host
+        self.smtp_port = settings.smtp_port
+        self.smtp_user = settings.smtp_user
+        self.smtp_password = settings.smtp_password
+        self.smtp_starttls = settings.smtp_starttls
 
-        message = EmailMessage()
-        message["From"] = self.sender_email
-        message["To"] = receiver
-        message["Subject"] = template.subject
-        message.set_content(template.html, "html")
+    def build_message(
+        self, receiver: EmailStr, email_type: EmailType, **kwargs
+    ) -> EmailMessage:
+        return build_message(self.sender_email, receiver, email_type, **kwargs)
 
-        with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-            server.starttls()
+    def connect(self) -> smtplib.SMTP:
+        """Open an authenticated connection to the configured SMTP relay."""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        try:
+            if self.smtp_starttls:
+                server.starttls()
             server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def send_email(self, receiver: EmailStr, email_type: EmailType, **kwargs):
+        message = self.build_message(receiver, email_type, **kwargs)
+
+        with self.connect() as server:
             server.send_message(message)
@@ -1,28 +1,48 @@
-from typing import Dict, Type
+import importlib
+from typing import TYPE_CHECKING, Dict, Type
 
 from .email_types import EmailType
-from .templates.email_base import EmailBase
+
+if TYPE_CHECKING:
+    from .templates.email_base import EmailBase
 
 
 class TemplateRegistry:
-    """Registry for email templates that allows automatic registration and creation."""
+    """Registry for email templates that allows automatic registration and creation.
+
+    The bundled templates register themselves through ``@register_template``
+    when the ``templates`` package is imported, which happens on the first
+    lookup rather than when the email package is imported.
+    """
 
-    _templates: Dict[EmailType, Type[EmailBase]] = {}
+    _templates: Dict[EmailType, Type["EmailBase"]] = {}
+    _templates_loaded = False
 
     @classmethod
-    def register(cls, email_type: EmailType, template_class: Type[EmailBase]):
+    def load_templates(cls):
+        """Import the bundled templates package once."""
+        if not cls._templates_loaded:
+            # Only mark success: threads racing the first import block on the
+            # import lock until the templates have registered themselves, and
+            # a failed import is retried on the next lookup.
+            importlib.import_module(".templates", __package__)
+            cls._templates_loaded = True
+
+    @classmethod
+    def register(cls, email_type: EmailType, template_class: Type["EmailBase"]):
         """Register a template class for a specific email type."""
         cls._templates[email_type] = template_class
 
     @classmethod
-    def get_template_class(cls, email_type: EmailType) -> Type[EmailBase]:
+    def get_template_class(cls, email_type: EmailType) -> Type["EmailBase"]:
         """Get the template class for a specific email type."""
+        cls.load_templates()
         if email_type not in cls._templates:
             raise ValueError(f"No template registered for email type: {email_type}")
         return cls._templates[email_type]
 
     @classmethod
-    def create_template(cls, email_type: EmailType, **kwargs) -> EmailBase:
+    def create_template(cls, email_type: EmailType, **kwargs) -> "EmailBase":
         """Create a template instance for the given email type with provided kwargs."""
         template_class = cls.get_template_class(email_type)
 
@@ -34,25 +54,18 @@ class TemplateRegistry:
     @classmethod
     def get_registered_types(cls) -> list[EmailType]:
         """Get all registered email types."""
+        cls.load_templates()
         return list(cls._templates.keys())
 
     @classmethod
     def is_registered(cls, email_type: EmailType) -> bool:
         """Check if an email type is registered."""
+        cls.load_templates()
         return email_type in cls._templates
 
-
-# Process any pending registrations from decorators
-def _initialize_registrations():
-    """Initialize all pending template registrations."""
-    try:
-        from .decorators import _process_pending_registrations
-
-        _process_pending_registrations()
-    except ImportError:
-        # decorators module not available yet
-        pass
-
-
-# Call initialization when module is loaded
-_initialize_registrations()
+    @classmethod
+    def compile_all(cls) -> None:
+        """Compile every registered template ahead of its first use."""
+        cls.load_templates()
+        for template_class in cls._templates.values():
+            template_class.compiled_html()
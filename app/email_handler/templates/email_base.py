@@ -1,7 +1,22 @@
 from abc import ABC, abstractmethod
+from typing import ClassVar
+
+import jinja2
 
 
 class EmailBase(ABC):
+    email_subject: ClassVar[str]
+    email_html: ClassVar[str]
+
+    _compiled_html: ClassVar[jinja2.Template | None] = None
+
+    @classmethod
+    def compiled_html(cls) -> jinja2.Template:
+        """Return the compiled ``email_html`` template, compiling it once per class."""
+        if cls.__dict__.get("_compiled_html") is None:
+            cls._compiled_html = jinja2.Template(cls.email_html)
+        return cls._compiled_html
+
     @staticmethod
     @abstractmethod
     def check_args(args: dict):
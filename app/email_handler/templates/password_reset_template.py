@@ -1,5 +1,3 @@
-import jinja2
-
 from ..decorators import register_template
 from ..email_types import EmailType
 from .email_base import EmailBase
@@ -7,13 +5,8 @@ from .email_base import EmailBase
 
 @register_template(EmailType.PASSWORD_RESET)
 class PasswordResetTemplate(EmailBase):
-    def __init__(self, otp: int, valid_time: str, username: str) -> None:
-        super().__init__()
-        self.otp = otp
-        self.valid_time = valid_time
-        self.username = username
-        self.email_subject = "Password Reset Request - Action Required"
-        self.email_html = """
+    email_subject = "Password Reset Request - Action Required"
+    email_html = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -79,14 +72,19 @@ class PasswordResetTemplate(EmailBase):
 </html>
 """
 
+    def __init__(self, otp: int, valid_time: str, username: str) -> None:
+        super().__init__()
+        self.otp = otp
+        self.valid_time = valid_time
+        self.username = username
+
     @property
     def subject(self) -> str:
         return self.email_subject
 
     @property
     def html(self) -> str:
-        template = jinja2.Template(self.email_html)
-        return template.render(
+        return self.compiled_html().render(
             otp=self.otp, valid_time=self.valid_time, username=self.username
         )
 
@@ -0,0 +1,355 @@
+"""Idempotency-Key support for retry-prone POST endpoints.
+
+A client sends ``Idempotency-Key: <unique value>`` with a request. The first
+request with a key runs normally and its response is stored; repeats of the
+same request with that key get the stored response back without the
+handler (and its hashing, writes and emails) running again.
+
+Responses are kept in an expiring in-memory store per process, or in Redis
+when ``IDEMPOTENCY_REDIS_URL`` is set so every worker shares them.
+"""
+
+import base64
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.settings import Settings
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# Request bodies are buffered to fingerprint them; these routes take small
+# JSON documents.
+MAX_BODY_BYTES = 64 * 1024
+# How long a key stays locked while its first request is being handled.
+IN_PROGRESS_TTL_SECONDS = 60
+# Besides 2xx, only deliberate rejections by the handler are stored.
+# Validation (422), auth (401/403) and rate limit (429) failures can go the
+# other way on a retry, so those keys are released instead.
+REPLAYED_ERROR_STATUSES = frozenset({400, 404, 409})
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "fingerprint": self.fingerprint,
+                "status": self.status,
+                "headers": [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in self.headers
+                ],
+                "body": base64.b64encode(self.body).decode(),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str | bytes) -> "StoredResponse":
+        raw = json.loads(data)
+        return cls(
+            fingerprint=raw["fingerprint"],
+            status=raw["status"],
+            headers=[
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in raw["headers"]
+            ],
+            body=base64.b64decode(raw["body"]),
+        )
+
+
+# Returned by IdempotencyStore.get() while the first request is running.
+IN_PROGRESS = object()
+
+
+class IdempotencyStoreFull(Exception):
+    """Raised by ``reserve`` when no entry can be dropped to make room."""
+
+
+class IdempotencyStore(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> StoredResponse | object | None:
+        """Return the stored response, ``IN_PROGRESS`` or ``None``."""
+
+    @abstractmethod
+    async def reserve(self, key: str) -> bool:
+        """Lock ``key`` for a first request; ``False`` if it is already taken.
+
+        Raises ``IdempotencyStoreFull`` if the store has no room for it.
+        """
+
+    @abstractmethod
+    async def save(self, key: str, response: StoredResponse) -> None:
+        """Store the response for ``key``, replacing the reservation."""
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """Drop the reservation so the request can be retried."""
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """Per-process store with a TTL and a cap on the number of entries.
+
+    At the cap the oldest stored response makes room. Reservations of
+    requests still running are never dropped, since that would let a retry
+    run the handler a second time; if they alone fill the store, new keys
+    are refused.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    async def get(self, key: str) -> StoredResponse | object | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    async def reserve(self, key: str) -> bool:
+        if await self.get(key) is not None:
+            return False
+        while len(self._entries) >= self.max_entries:
+            if not self._evict_one():
+                raise IdempotencyStoreFull
+        self._set(key, IN_PROGRESS, IN_PROGRESS_TTL_SECONDS)
+        return True
+
+    async def save(self, key: str, response: StoredResponse) -> None:
+        self._set(key, response, self.ttl_seconds)
+        while len(self._entries) > self.max_entries and self._evict_one():
+            pass
+
+    async def release(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def _set(self, key: str, value: object, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+    def _evict_one(self) -> bool:
+        """Drop the oldest entry that is not a live reservation."""
+        now = time.monotonic()
+        for key, (expires_at, value) in self._entries.items():
+            if value is not IN_PROGRESS or expires_at <= now:
+                del self._entries[key]
+                return True
+        return False
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """Store shared by every worker; requires the optional ``redis`` package."""
+
+    IN_PROGRESS_MARKER = b"in-progress"
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "idempotency:"):
+        try:
+            from redis.asyncio import Redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "IDEMPOTENCY_REDIS_URL is set but the 'redis' package is not "
+                "installed; install the 'redis' extra."
+            ) from exc
+
+        self.redis = Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, key: str) -> StoredResponse | object | None:
+        value = await self.redis.get(self.prefix + key)
+        if value is None:
+            return None
+        if value == self.IN_PROGRESS_MARKER:
+            return IN_PROGRESS
+        return StoredResponse.from_json(value)
+
+    async def reserve(self, key: str) -> bool:
+        return bool(
+            await self.redis.set(
+                self.prefix + key,
+                self.IN_PROGRESS_MARKER,
+                nx=True,
+                ex=IN_PROGRESS_TTL_SECONDS,
+            )
+        )
+
+    async def save(self, key: str, response: StoredResponse) -> None:
+        await self.redis.set(self.prefix + key, response.to_json(), ex=self.ttl_seconds)
+
+    async def release(self, key: str) -> None:
+        await self.redis.delete(self.prefix + key)
+
+
+def create_idempotency_store(settings: Settings) -> IdempotencyStore:
+    if settings.idempotency_redis_url:
+        return RedisIdempotencyStore(
+            settings.idempotency_redis_url, settings.idempotency_ttl_seconds
+        )
+    return InMemoryIdempotencyStore(
+        settings.idempotency_ttl_seconds, settings.idempotency_max_entries
+    )
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware that replays stored responses for repeated keys.
+
+    Only POST requests to ``paths`` that carry an ``Idempotency-Key`` header
+    are affected. A key reused with a different request body or query gets
+    a 422, and a repeat that arrives while the first request is still
+    running gets a 409. Only successful responses and the rejections in
+    ``REPLAYED_ERROR_STATUSES`` are stored; after anything else the key is
+    released so the request can be retried with it. Bodies over
+    ``MAX_BODY_BYTES`` get a 413.
+    """
+
+    def __init__(self, app: ASGIApp, store: IdempotencyStore, paths: set[str]):
+        self.app = app
+        self.store = store
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_error(
+                send,
+                400,
+                f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters",
+            )
+            return
+
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+            await _send_error(send, 413, "Request body too large")
+            return
+        parts = []
+        size = 0
+        while True:
+            message = await receive()
+            part = message.get("body", b"")
+            size += len(part)
+            if size > MAX_BODY_BYTES:
+                await _send_error(send, 413, "Request body too large")
+                return
+            parts.append(part)
+            if not message.get("more_body"):
+                break
+        body = b"".join(parts)
+
+        key = f"{scope['path']}:{idempotency_key.decode('latin-1')}"
+        fingerprint = hashlib.sha256(scope["query_string"] + b"\0" + body).hexdigest()
+
+        stored = await self.store.get(key)
+        try:
+            if stored is None and not await self.store.reserve(key):
+                stored = IN_PROGRESS
+        except IdempotencyStoreFull:
+            await _send_error(send, 503, "Too many requests in progress; retry later")
+            return
+        if stored is IN_PROGRESS:
+            await _send_error(
+                send, 409, "A request with this Idempotency-Key is in progress"
+            )
+            return
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                await _send_error(
+                    send,
+                    422,
+                    "Idempotency-Key was already used for a different request",
+                )
+                return
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": stored.status,
+                    "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+                }
+            )
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+        saved = False
+
+        async def capture_send(message: Message) -> None:
+            nonlocal start, saved
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body") and _is_replayed(start["status"]):
+                    # Store before background tasks run, so retries that
+                    # arrive while an email is being sent are replayed.
+                    await self.store.save(
+                        key,
+                        StoredResponse(
+                            fingerprint=fingerprint,
+                            status=start["status"],
+                            headers=list(start.get("headers", [])),
+                            body=b"".join(chunks),
+                        ),
+                    )
+                    saved = True
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if not saved:
+                await self.store.release(key)
+
+
+def _is_replayed(status: int) -> bool:
+    return 200 <= status < 300 or status in REPLAYED_ERROR_STATUSES
+
+
+async def _send_error(send: Send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,98 @@
+"""Production server entry point.
+
+Runs the app under gunicorn with uvicorn workers::
+
+    python -m app.launcher
+
+The number of workers comes from ``WEB_CONCURRENCY`` (defaults to the CPU
+count). The app is imported once in the master before forking so workers
+share its memory copy-on-write, and workers use uvloop and httptools when
+they are installed.
+
+Send ``HUP`` to the master to gracefully replace all workers, ``TTIN`` /
+``TTOU`` to add or remove one. Because the app is preloaded, deploying new
+code needs a fresh master: send ``USR2`` to start one alongside the old
+master, then ``TERM`` the old one once the new workers are up.
+"""
+
+import os
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from app.settings import Settings, get_settings
+
+CPU_COUNT = os.cpu_count() or 1
+
+
+class Worker(UvicornWorker):
+    # "auto" picks uvloop and httptools when they are importable.
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto", "lifespan": "on"}
+
+
+def worker_resource_limits(settings: Settings, workers: int) -> dict[str, str]:
+    """Split the database and CPU budget evenly across ``workers``.
+
+    Every worker gets an equal share of ``DB_MAX_CONNECTIONS`` (the total
+    connections all workers together may open) with no overflow, so the
+    total never exceeds the database limit, and an equal share of the cores
+    for its password hashing pool.
+    """
+    return {
+        "DB_POOL_SIZE": str(max(1, settings.db_max_connections // workers)),
+        "DB_MAX_OVERFLOW": "0",
+        "HASH_POOL_WORKERS": str(max(1, CPU_COUNT // workers)),
+    }
+
+
+def post_fork(server, worker) -> None:
+    # Connections opened by the master while preloading must not be shared
+    # with the children; give each worker a fresh pool.
+    from app.sharding import shard_router
+
+    for engine in shard_router.engines:
+        engine.dispose(close=False)
+
+
+class ProductionApplication(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        from app.main import app
+
+        return app
+
+
+def main() -> None:
+    settings = get_settings()
+    workers = settings.web_concurrency or CPU_COUNT
+    for key, value in worker_resource_limits(settings, workers).items():
+        # Explicit settings in the environment win over the computed share.
+        os.environ.setdefault(key, value)
+    # Reload so the app preloaded below sees the per-worker limits.
+    get_settings.cache_clear()
+
+    options = {
+        "bind": f"{settings.host}:{settings.port}",
+        "workers": workers,
+        "worker_class": "app.launcher.Worker",
+        "preload_app": True,
+        "post_fork": post_fork,
+        "graceful_timeout": settings.graceful_timeout,
+        "timeout": settings.worker_timeout,
+        "keepalive": settings.keepalive,
+        "max_requests": settings.max_requests,
+        "max_requests_jitter": settings.max_requests // 10,
+    }
+    ProductionApplication(options).run()
+
+
+if __name__ == "__main__":
+    main()
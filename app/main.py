@@ -1,11 +1,111 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from app.api import IDEMPOTENT_PATHS, admin_router, auth_router
+from app.auth_utils import warm_up_hasher
+from app.db import warm_up_pool
+from app.email_filter import known_emails, maintain_known_emails
+from app.email_handler import TemplateRegistry, get_async_email_handler
+from app.idempotency import IdempotencyMiddleware, create_idempotency_store
+from app.settings import get_settings
+from app.sharding import check_username_claims, shard_router
+from app.user_import import shutdown_hash_pool
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_RETRY_SECONDS = 5
+
+
+async def warm_up(app: FastAPI) -> None:
+    """Prepare everything the first requests would otherwise pay for.
+
+    Also holds readiness back while the shards lack username claims (see
+    ``check_username_claims``), retrying until ``reshard`` has filled them.
+    """
+    while True:
+        try:
+            await run_in_threadpool(check_username_claims, shard_router)
+            connections = 0
+            for engine in shard_router.engines:
+                connections += await run_in_threadpool(warm_up_pool, engine)
+            await run_in_threadpool(warm_up_hasher)
+        except Exception:
+            logger.exception(
+                "Warm-up failed, retrying in %s seconds", WARM_UP_RETRY_SECONDS
+            )
+            await asyncio.sleep(WARM_UP_RETRY_SECONDS)
+        else:
+            break
+    app.state.ready = True
+    logger.info("Warm-up complete (%d database connections ready)", connections)
+    warm_up_email()
+
+
+def warm_up_email() -> None:
+    """Prepare the mail path once, without holding up readiness.
+
+    Mail is not needed to serve traffic, so a missing or broken mail setup
+    is reported once here and otherwise only affects the requests that
+    send email.
+    """
+    try:
+        TemplateRegistry.compile_all()
+        get_async_email_handler()
+    except Exception:
+        logger.warning("Email is unavailable", exc_info=True)
 
-from app.api import auth_router
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /health answers while /ready stays 503.
+    settings = get_settings()
+    app.state.ready = False
+    tasks = [asyncio.create_task(warm_up(app))]
+    if known_emails.enabled:
+        tasks.append(
+            asyncio.create_task(
+                maintain_known_emails(
+                    known_emails,
+                    settings.email_filter_refresh_seconds,
+                    settings.email_filter_rebuild_seconds,
+                )
+            )
+        )
+    yield
+    for task in tasks:
+        task.cancel()
+    await run_in_threadpool(shutdown_hash_pool)
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
+app.include_router(admin_router)
+
+
+@app.get("/health", tags=["Health"])
+async def health():
+    return {"status": "ok"}
+
 
+@app.get("/ready", tags=["Health"])
+async def ready():
+    # Unset until the lifespan has started.
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming up"})
+    return {"status": "ready"}
+
+
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=create_idempotency_store(get_settings()),
+    paths=IDEMPOTENT_PATHS,
+)
 
 # Configure Cors
 app.add_middleware(
@@ -0,0 +1,136 @@
+"""Operations for migrating large, busy tables without long locks.
+
+Plain ``op.create_index`` and ``UPDATE ... SET`` hold locks on the whole
+table for as long as they run, blocking logins and registrations. Revisions
+that touch ``users`` or ``otps`` should use these helpers instead::
+
+    from app.migration_helpers import backfill, create_index_concurrently
+
+    def upgrade() -> None:
+        create_index_concurrently("ix_otps_user_id", "otps", ["user_id"])
+        backfill("users", {"locale": "en"}, "locale IS NULL")
+
+Both commit as they go, outside the revision's transaction, so put them in
+a revision of their own (``env.py`` runs one transaction per revision) and
+keep them idempotent: an interrupted run is finished by running it again.
+Column changes should go through ``op.batch_alter_table``, which ``env.py``
+makes work on SQLite by copying the table.
+"""
+
+import logging
+import time
+
+import sqlalchemy as sa
+from alembic import op
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+BACKFILL_PAUSE_SECONDS = 0.1
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_concurrently(
+    name: str, table: str, columns: list[str], unique: bool = False
+) -> None:
+    """Create an index without blocking writes to ``table``.
+
+    On PostgreSQL this is ``CREATE INDEX CONCURRENTLY`` run outside the
+    migration transaction; an invalid index left behind by an earlier
+    failed attempt is dropped and rebuilt. Other databases get a plain
+    ``CREATE INDEX``.
+    """
+    if not _is_postgresql():
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        # Offline (--sql) runs can't look at the database.
+        invalid = not op.get_context().as_sql and op.get_bind().scalar(
+            sa.text(
+                "SELECT NOT indisvalid FROM pg_index "
+                "WHERE indexrelid = to_regclass(:name)"
+            ),
+            {"name": name},
+        )
+        if invalid:
+            logger.info("Dropping invalid index %s before rebuilding it", name)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.create_index(
+            name,
+            table,
+            columns,
+            unique=unique,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    """Drop an index without blocking reads or writes to ``table``."""
+    if not _is_postgresql():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            name, table_name=table, if_exists=True, postgresql_concurrently=True
+        )
+
+
+def backfill(
+    table: str,
+    values: dict,
+    where: str | None = None,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause_seconds: float = BACKFILL_PAUSE_SECONDS,
+) -> int:
+    """Set ``values`` on rows matching ``where``, one committed batch at a time.
+
+    Rows are walked in primary key order (the table must have an integer
+    ``id``), so each batch locks at most ``batch_size`` rows for a short
+    transaction, and the pause between batches leaves room for regular
+    traffic and replication. ``where`` should exclude rows that are already
+    done so a rerun picks up where it stopped. Progress is logged per batch.
+    Returns the number of rows updated.
+    """
+    if op.get_context().as_sql:
+        raise RuntimeError(
+            f"Backfilling {table} needs a database connection; "
+            "run this revision online instead of with --sql"
+        )
+
+    target = sa.table(table, sa.column("id"), *(sa.column(name) for name in values))
+    condition = sa.text(where) if where is not None else sa.true()
+    bind = op.get_bind()
+    total = bind.scalar(sa.select(sa.func.count()).select_from(target).where(condition))
+    logger.info("Backfilling %d rows of %s", total, table)
+
+    updated = 0
+    last_id = None
+    started = time.monotonic()
+    with op.get_context().autocommit_block():
+        while True:
+            query = sa.select(target.c.id).where(condition)
+            if last_id is not None:
+                query = query.where(target.c.id > last_id)
+            ids = bind.scalars(query.order_by(target.c.id).limit(batch_size)).all()
+            if not ids:
+                break
+            last_id = ids[-1]
+            # Autocommit: every batch is its own short transaction.
+            bind.execute(sa.update(target).where(target.c.id.in_(ids)).values(**values))
+            updated += len(ids)
+            elapsed = time.monotonic() - started
+            logger.info(
+                "%s: %d/%d rows (%.0f rows/s)",
+                table,
+                updated,
+                total,
+                updated / elapsed if elapsed else 0,
+            )
+            time.sleep(pause_seconds)
+    return updated
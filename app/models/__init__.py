@@ -1,2 +1,2 @@
-from .auth import UserOTP, User  # noqa: F401
+from .auth import UserOTP, User, UsernameClaim  # noqa: F401
 from .base import Base  # noqa: F401
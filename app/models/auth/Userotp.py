@@ -14,4 +14,4 @@ class UserOTP(Base):
     expiration = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), default=get_time)
     updated_at = Column(DateTime(timezone=True), default=get_time, onupdate=get_time)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
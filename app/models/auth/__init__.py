@@ -1,2 +1,3 @@
 from .user import User  # noqa: F401
+from .username import UsernameClaim  # noqa: F401
 from .Userotp import UserOTP  # noqa: F401
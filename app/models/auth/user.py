@@ -14,7 +14,7 @@ class User(Base):
     password = Column(String(255), nullable=False)
     verified = Column(Boolean, nullable=False, default=False)
     max_ttl_minutes = Column(Integer, nullable=False, default=60)
-    created_at = Column(DateTime(timezone=True), default=get_time)
+    created_at = Column(DateTime(timezone=True), default=get_time, index=True)
     updated_at = Column(DateTime(timezone=True), default=get_time, onupdate=get_time)
 
     def __repr__(self) -> str:
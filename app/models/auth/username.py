@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.utils import get_time
+
+from ..base import Base
+
+
+class UsernameClaim(Base):
+    """Owner of a username when users are sharded.
+
+    ``users.username`` is only unique within one database, so each username
+    is also claimed in this table on the shard its hash picks; the primary
+    key makes the claim, and so the username, unique across shards.
+    """
+
+    __tablename__ = "usernames"
+
+    username = Column(String(255), primary_key=True)
+    email = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=get_time)
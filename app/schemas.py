@@ -1,4 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 
 class UserRegisterDTO(BaseModel):
@@ -6,8 +8,19 @@ class UserRegisterDTO(BaseModel):
     email: EmailStr
     password: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserImportRow(UserRegisterDTO):
+    verified: bool = False
+
+
+class UserImportResult(BaseModel):
+    inserted: int
+    duplicates: int
+    invalid: int
+    errors: list[str]
+    verification_emails_queued: int
 
 
 class GetUserDTO(BaseModel):
@@ -15,16 +28,29 @@ class GetUserDTO(BaseModel):
     email: EmailStr
     username: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AdminUserDTO(BaseModel):
+    id: int
+    email: EmailStr
+    username: str
+    verified: bool
+    created_at: datetime | None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserPage(BaseModel):
+    items: list[AdminUserDTO]
+    next_after_id: int | None
 
 
 class UserLoginDTO(BaseModel):
     email: EmailStr
     password: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserOTPVerify(BaseModel):
@@ -40,3 +66,12 @@ class ResetPasswordRequest(BaseModel):
     email: EmailStr
     otp: int
     new_password: str
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
+
+class MessageResponse(BaseModel):
+    message: str
@@ -0,0 +1,128 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+def _int(name: str, default: int | None = None) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Application configuration, read from the environment (and ``.env``)."""
+
+    # Database
+    database_url: str
+    shard_database_urls: tuple[str, ...]
+    shard_epoch: int
+    db_pool_size: int | None
+    db_max_overflow: int | None
+    migration_lock_timeout: str
+
+    # Auth
+    algorithm: str
+    secret_key: str
+    access_token_expire_minutes: float
+    admin_api_key: str | None
+
+    # Email
+    smtp_host: str | None
+    smtp_port: int | None
+    smtp_user: str | None
+    smtp_password: str | None
+    sender_email: str | None
+    smtp_starttls: bool
+
+    # Idempotency keys
+    idempotency_ttl_seconds: int
+    idempotency_max_entries: int
+    idempotency_redis_url: str | None
+
+    # Known-email filter
+    email_filter_enabled: bool
+    email_filter_capacity: int
+    email_filter_error_rate: float
+    email_filter_refresh_seconds: int
+    email_filter_refresh_lookback_seconds: int
+    email_filter_rebuild_seconds: int
+
+    # Bulk import
+    import_batch_size: int
+    hash_pool_workers: int | None
+
+    # Production launcher
+    host: str
+    port: int
+    web_concurrency: int | None
+    db_max_connections: int
+    graceful_timeout: int
+    worker_timeout: int
+    keepalive: int
+    max_requests: int
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.getenv("DATABASE_URL", "sqlite:///url_shortener.db"),
+            shard_database_urls=tuple(
+                url.strip()
+                for url in os.getenv("SHARD_DATABASE_URLS", "").split(",")
+                if url.strip()
+            ),
+            shard_epoch=_int("SHARD_EPOCH", 0),
+            db_pool_size=_int("DB_POOL_SIZE"),
+            db_max_overflow=_int("DB_MAX_OVERFLOW"),
+            migration_lock_timeout=os.getenv("MIGRATION_LOCK_TIMEOUT", "5s"),
+            algorithm=os.getenv("ALGORITHM", "HS256"),
+            secret_key=os.getenv(
+                "SECRET_KEY", "thisisalongandrandomsecretkeyforthisstupidapp"
+            ),
+            access_token_expire_minutes=float(
+                os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15)
+            ),
+            admin_api_key=os.getenv("ADMIN_API_KEY") or None,
+            smtp_host=os.getenv("SMTP_HOST") or None,
+            smtp_port=_int("SMTP_PORT"),
+            smtp_user=os.getenv("SMTP_USER") or None,
+            smtp_password=os.getenv("SMTP_PASSWORD") or None,
+            sender_email=os.getenv("SENDER_EMAIL") or None,
+            smtp_starttls=_bool("SMTP_STARTTLS", True),
+            idempotency_ttl_seconds=_int("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60),
+            idempotency_max_entries=_int("IDEMPOTENCY_MAX_ENTRIES", 10_000),
+            idempotency_redis_url=os.getenv("IDEMPOTENCY_REDIS_URL") or None,
+            email_filter_enabled=_bool("EMAIL_FILTER_ENABLED", True),
+            email_filter_capacity=_int("EMAIL_FILTER_CAPACITY", 100_000),
+            email_filter_error_rate=float(os.getenv("EMAIL_FILTER_ERROR_RATE", 0.01)),
+            email_filter_refresh_seconds=_int("EMAIL_FILTER_REFRESH_SECONDS", 10),
+            email_filter_refresh_lookback_seconds=_int(
+                "EMAIL_FILTER_REFRESH_LOOKBACK_SECONDS", 60
+            ),
+            email_filter_rebuild_seconds=_int("EMAIL_FILTER_REBUILD_SECONDS", 3600),
+            import_batch_size=_int("IMPORT_BATCH_SIZE", 1000),
+            hash_pool_workers=_int("HASH_POOL_WORKERS"),
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=_int("PORT", 8000),
+            web_concurrency=_int("WEB_CONCURRENCY"),
+            db_max_connections=_int("DB_MAX_CONNECTIONS", 100),
+            graceful_timeout=_int("GRACEFUL_TIMEOUT", 30),
+            worker_timeout=_int("WORKER_TIMEOUT", 60),
+            keepalive=_int("KEEPALIVE", 5),
+            max_requests=_int("MAX_REQUESTS", 0),
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Load ``.env`` and the environment once per process."""
+    load_dotenv()
+    return Settings.from_env()
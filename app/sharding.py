@@ -0,0 +1,339 @@
+"""Optional hash sharding of user data across several databases.
+
+With ``SHARD_DATABASE_URLS`` unset everything lives in the single
+``DATABASE_URL`` database and user ids are the plain primary keys. When it
+is set to a comma-separated list of URLs, each user (and their OTP rows)
+lives on the shard picked by hashing their normalized email, and the ids
+exposed by the API and embedded in tokens carry the shard number in their
+low ``SHARD_BITS`` bits, so a user can be found from their id alone.
+Usernames are claimed in the ``usernames`` table of the shard picked by
+hashing the username, which keeps them unique across shards::
+
+    SHARD_DATABASE_URLS=sqlite:///shard0.db,sqlite:///shard1.db
+
+Changing the number of shards moves users between databases and changes
+their ids; use ``python -m app.cli reshard`` to migrate. That includes moving
+an unsharded database to the sharded layout: it has no username claims, and
+the app stays unready until every user has one.
+"""
+
+import hashlib
+from collections.abc import Iterator
+
+from sqlalchemy import Engine, delete, func, select
+from sqlalchemy.orm import Session, object_session, sessionmaker
+
+from app.auth_utils import generate_otp
+from app.db import Session as DefaultSession
+from app.db import engine as default_engine
+from app.db import create_app_engine, insert_ignoring_conflicts
+from app.models import User, UsernameClaim, UserOTP
+from app.settings import get_settings
+from app.utils import get_time, normalize_email
+
+SHARD_BITS = 10
+MAX_SHARDS = 1 << SHARD_BITS
+
+
+def _shard_for_key(key: str, shard_count: int) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def shard_for_email(email: str, shard_count: int) -> int:
+    return _shard_for_key(normalize_email(email), shard_count)
+
+
+def shard_for_username(username: str, shard_count: int) -> int:
+    return _shard_for_key(username, shard_count)
+
+
+class ShardRouter:
+    def __init__(self, urls: tuple[str, ...] = ()):
+        if len(urls) > MAX_SHARDS:
+            raise ValueError(f"At most {MAX_SHARDS} shards are supported")
+
+        self.sharded = bool(urls)
+        if self.sharded:
+            self.engines: list[Engine] = [create_app_engine(url) for url in urls]
+            self.sessionmakers = [sessionmaker(bind=engine) for engine in self.engines]
+        else:
+            self.engines = [default_engine]
+            self.sessionmakers = [DefaultSession]
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.engines)
+
+    def shard_for_email(self, email: str) -> int:
+        return shard_for_email(email, self.shard_count)
+
+    def shard_for_username(self, username: str) -> int:
+        return shard_for_username(username, self.shard_count)
+
+    def session(self, shard: int) -> Session:
+        db = self.sessionmakers[shard]()
+        db.info["shard"] = shard
+        return db
+
+    def encode_user_id(self, shard: int, local_id: int) -> int:
+        """Turn a shard-local primary key into the id exposed by the API."""
+        if not self.sharded:
+            return local_id
+        return (local_id << SHARD_BITS) | shard
+
+    def decode_user_id(self, user_id: int) -> tuple[int, int]:
+        """Split an API user id into ``(shard, local primary key)``."""
+        if not self.sharded:
+            return 0, user_id
+        shard = user_id & (MAX_SHARDS - 1)
+        if shard >= self.shard_count:
+            raise ValueError(f"User id {user_id} points at unknown shard {shard}")
+        return shard, user_id >> SHARD_BITS
+
+    def local_after_id(self, shard: int, after_id: int) -> int:
+        """Largest local id on ``shard`` whose API id is ``<= after_id``."""
+        if not self.sharded:
+            return after_id
+        return (after_id - shard) >> SHARD_BITS
+
+    def user_id(self, user) -> int:
+        """API id of a ``User`` loaded through a shard session."""
+        return self.encode_user_id(object_session(user).info["shard"], user.id)
+
+
+class ShardSessions:
+    """Per-request access to shard sessions, opened lazily and closed together."""
+
+    def __init__(self, router: ShardRouter):
+        self.router = router
+        self._sessions: dict[int, Session] = {}
+
+    def get(self, shard: int) -> Session:
+        if shard not in self._sessions:
+            self._sessions[shard] = self.router.session(shard)
+        return self._sessions[shard]
+
+    def for_email(self, email: str) -> Session:
+        return self.get(self.router.shard_for_email(email))
+
+    def for_username(self, username: str) -> Session:
+        """Return the session holding the claim on ``username``."""
+        return self.get(self.router.shard_for_username(username))
+
+    def for_user_id(self, user_id: int) -> tuple[Session, int]:
+        """Return the session holding ``user_id`` and its local primary key."""
+        shard, local_id = self.router.decode_user_id(user_id)
+        return self.get(shard), local_id
+
+    def all(self) -> Iterator[Session]:
+        for shard in range(self.router.shard_count):
+            yield self.get(shard)
+
+    def close(self) -> None:
+        for db in self._sessions.values():
+            db.close()
+        self._sessions.clear()
+
+    def __enter__(self) -> "ShardSessions":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _group_by_owner(shards: ShardSessions, usernames) -> dict[Session, list[str]]:
+    groups: dict[Session, list[str]] = {}
+    for username in usernames:
+        groups.setdefault(shards.for_username(username), []).append(username)
+    return groups
+
+
+def claim_usernames(
+    shards: ShardSessions, claims: dict[str, str]
+) -> tuple[set[str], set[str]]:
+    """Claim usernames (mapped to the registering email) before inserting users.
+
+    Returns ``(owned, created)``: the usernames that now belong to the given
+    emails, and the subset whose claim this call inserted. A claim left by
+    an earlier attempt with the same email (e.g. one interrupted before the
+    user row was written) counts as owned. Claims are committed right away
+    so concurrent registrations on other shards see them; release
+    ``created`` with :func:`release_usernames` if the user insert fails.
+    Unsharded, the unique constraint on ``users.username`` is enough and
+    every username is returned as owned.
+    """
+    if not shards.router.sharded:
+        return set(claims), set()
+
+    owned, created = set(), set()
+    for db, usernames in _group_by_owner(shards, claims).items():
+        stmt = insert_ignoring_conflicts(db, UsernameClaim).returning(
+            UsernameClaim.username
+        )
+        rows = [{"username": name, "email": claims[name]} for name in usernames]
+        created.update(db.execute(stmt, rows).scalars())
+        lost = set(usernames) - created
+        if lost:
+            existing = db.execute(
+                select(UsernameClaim.username, UsernameClaim.email).where(
+                    UsernameClaim.username.in_(lost)
+                )
+            )
+            owned.update(name for name, email in existing if email == claims[name])
+        db.commit()
+    owned |= created
+    return owned, created
+
+
+def release_usernames(shards: ShardSessions, usernames) -> None:
+    """Drop claims made by :func:`claim_usernames` for users never inserted."""
+    if not shards.router.sharded:
+        return
+    for db, names in _group_by_owner(shards, usernames).items():
+        db.execute(delete(UsernameClaim).where(UsernameClaim.username.in_(names)))
+        db.commit()
+
+
+def taken_usernames(shards: ShardSessions, usernames) -> set[str]:
+    """Return which of ``usernames`` already belong to someone."""
+    if not shards.router.sharded:
+        db = shards.get(0)
+        return set(
+            db.scalars(select(User.username).where(User.username.in_(usernames)))
+        )
+
+    taken = set()
+    for db, names in _group_by_owner(shards, usernames).items():
+        taken.update(
+            db.scalars(
+                select(UsernameClaim.username).where(UsernameClaim.username.in_(names))
+            )
+        )
+    return taken
+
+
+def check_username_claims(router: ShardRouter) -> None:
+    """Raise ``RuntimeError`` if the shards hold more users than claims.
+
+    Only the sharded code paths write claims, so shards filled any other way
+    (an unsharded database listed in ``SHARD_DATABASE_URLS``, rows copied by
+    hand) would hand their usernames out again. The counts are a cheap
+    necessary condition, not a per-user audit.
+    """
+    if not router.sharded:
+        return
+    users = claims = 0
+    for shard in range(router.shard_count):
+        with router.session(shard) as db:
+            users += db.scalar(select(func.count()).select_from(User))
+            claims += db.scalar(select(func.count()).select_from(UsernameClaim))
+    if claims < users:
+        raise RuntimeError(
+            f"{users - claims} users have no username claim; fill the shards "
+            "with `python -m app.cli reshard` from the previous layout"
+        )
+
+
+RESHARD_BATCH_SIZE = 1000
+# Columns copied as-is when a user moves; ids are reassigned by the target.
+USER_COPY_COLUMNS = (
+    "email",
+    "username",
+    "password",
+    "verified",
+    "max_ttl_minutes",
+    "created_at",
+    "updated_at",
+)
+OTP_COPY_COLUMNS = ("otp", "used", "expiration", "created_at", "updated_at")
+
+
+def reshard_users(
+    source: ShardRouter, target: ShardRouter, batch_size: int = RESHARD_BATCH_SIZE
+) -> int:
+    """Copy every user and their OTPs from ``source`` into ``target``.
+
+    Users are placed by email hash over the target's shards and get new
+    local ids there, so API ids (and the tokens carrying them) change.
+    Usernames are claimed on the target's shards as well. Users already
+    present on the target are skipped, which makes an
+    interrupted run safe to repeat. Returns the number of users copied.
+    """
+    copied = 0
+    for shard in range(source.shard_count):
+        with source.session(shard) as db:
+            last_id = 0
+            while users := db.scalars(
+                select(User)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
+            ).all():
+                last_id = users[-1].id
+                otps = db.scalars(
+                    select(UserOTP).where(
+                        UserOTP.user_id.in_([user.id for user in users])
+                    )
+                ).all()
+                with ShardSessions(target) as target_shards:
+                    claim_usernames(
+                        target_shards, {user.username: user.email for user in users}
+                    )
+                copied += _copy_users(target, users, otps)
+    return copied
+
+
+def _copy_users(target: ShardRouter, users: list, otps: list) -> int:
+    otps_by_user: dict[int, list] = {}
+    for otp in otps:
+        otps_by_user.setdefault(otp.user_id, []).append(otp)
+
+    users_by_shard: dict[int, list] = {}
+    for user in users:
+        users_by_shard.setdefault(target.shard_for_email(user.email), []).append(user)
+
+    copied = 0
+    for shard, shard_users in users_by_shard.items():
+        with target.session(shard) as db:
+            stmt = insert_ignoring_conflicts(db, User).returning(User.id, User.email)
+            rows = [
+                {column: getattr(user, column) for column in USER_COPY_COLUMNS}
+                for user in shard_users
+            ]
+            new_ids = {email: user_id for user_id, email in db.execute(stmt, rows)}
+
+            otp_rows = [
+                {"user_id": new_ids[user.email]}
+                | {column: getattr(otp, column) for column in OTP_COPY_COLUMNS}
+                for user in shard_users
+                if user.email in new_ids
+                for otp in otps_by_user.get(user.id, [])
+            ]
+            while otp_rows:
+                stmt = insert_ignoring_conflicts(db, UserOTP).returning(
+                    UserOTP.user_id, UserOTP.otp
+                )
+                landed = set(db.execute(stmt, otp_rows).tuples())
+                # A code already taken on the target is replaced by an expired
+                # placeholder; the user can request a new one.
+                otp_rows = [
+                    row
+                    | {"otp": generate_otp(), "used": True, "expiration": get_time()}
+                    for row in otp_rows
+                    if (row["user_id"], row["otp"]) not in landed
+                ]
+            db.commit()
+            copied += len(new_ids)
+    return copied
+
+
+shard_router = ShardRouter(get_settings().shard_database_urls)
+
+
+def get_shards():
+    shards = ShardSessions(shard_router)
+    try:
+        yield shards
+    finally:
+        shards.close()
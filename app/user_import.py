@@ -0,0 +1,340 @@
+import csv
+import json
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import BrokenExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+from typing import TYPE_CHECKING, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.auth_utils import generate_otp, hash_password
+from app.db import insert_ignoring_conflicts
+from app.email_filter import known_emails
+from app.email_handler import EmailType, get_async_email_handler
+from app.models import User, UserOTP
+from app.schemas import UserImportRow
+from app.settings import get_settings
+from app.sharding import (
+    ShardSessions,
+    claim_usernames,
+    release_usernames,
+    taken_usernames,
+)
+from app.utils import get_expiration_time, get_time
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, ProcessPoolExecutor
+
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_BATCH_SIZE = get_settings().import_batch_size
+MAX_IMPORT_BATCH_SIZE = 10_000
+HASH_POOL_WORKERS = get_settings().hash_pool_workers or os.cpu_count() or 1
+VERIFICATION_OTP_EXPIRE_MINUTES = 60 * 24
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list[str] = field(default_factory=list)
+    # (email, username, otp) for every inserted user that should be mailed
+    verification_emails: list[tuple[str, str, int]] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+
+def detect_format(filename: str | None) -> str:
+    extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    if extension in ("json", "ndjson"):
+        extension = "jsonl"
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(
+            f"Cannot infer import format from {filename!r}; "
+            f"expected one of {', '.join(IMPORT_FORMATS)}"
+        )
+    return extension
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[tuple[int, dict | None]]:
+    """Stream ``(line_number, row)`` pairs from a CSV or JSONL file.
+
+    ``row`` is ``None`` when a JSONL line cannot be decoded.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def create_hash_pool(workers: int = HASH_POOL_WORKERS) -> "ProcessPoolExecutor":
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Forking a process that runs an event loop and threadpool threads
+    # (the admin route) can deadlock the children; start them from a clean
+    # forkserver instead.
+    mp_context = multiprocessing.get_context("forkserver")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+
+
+@lru_cache
+def get_hash_pool() -> "ProcessPoolExecutor":
+    """Return the process's shared hashing pool, created on first use.
+
+    Imports reuse it instead of paying for worker start-up every time.
+    """
+    return create_hash_pool()
+
+
+def shutdown_hash_pool() -> None:
+    if get_hash_pool.cache_info().currsize:
+        get_hash_pool().shutdown(cancel_futures=True)
+        get_hash_pool.cache_clear()
+
+
+class UserImporter:
+    """Bulk-insert users streamed from an import file.
+
+    Rows are validated, deduplicated against the file and the database with
+    one set-based query per batch, hashed in a process pool (the shared
+    ``get_hash_pool()`` unless one is passed in) and inserted with one
+    multi-row ``INSERT ... ON CONFLICT DO NOTHING`` per batch. Hashing of the
+    next batch overlaps with the insert of the current one, so the import
+    runs at roughly the speed of the hashing pool. With sharding, each batch
+    is split by shard: emails are checked and rows inserted on their own
+    shard, while usernames are claimed on the shards that own them.
+    """
+
+    def __init__(
+        self,
+        shards: ShardSessions,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        pool: "Executor | None" = None,
+        hash_workers: int = HASH_POOL_WORKERS,
+        send_verification: bool = False,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.shards = shards
+        self.batch_size = batch_size
+        self._shared_pool = pool is None
+        self.pool = pool or get_hash_pool()
+        # Workers in ``pool``; only used to size the hashing chunks.
+        self.hash_workers = hash_workers
+        self.send_verification = send_verification
+        self.result = ImportResult()
+        self._seen_emails: set[str] = set()
+        self._seen_usernames: set[str] = set()
+
+    def run(self, rows: Iterable[tuple[int, dict | None]]) -> ImportResult:
+        rows = iter(rows)
+        pending = None
+        try:
+            while batch := list(islice(rows, self.batch_size)):
+                users = self._dedupe(self._validate(batch))
+                hashes = self.pool.map(
+                    hash_password,
+                    [user.password for user in users],
+                    chunksize=max(1, len(users) // (4 * self.hash_workers)),
+                )
+                if pending is not None:
+                    self._insert(*pending)
+                pending = (users, hashes)
+            if pending is not None:
+                self._insert(*pending)
+        except BrokenExecutor:
+            # A dead worker breaks the pool for good; let the next import
+            # start a fresh one.
+            if self._shared_pool:
+                shutdown_hash_pool()
+            raise
+        return self.result
+
+    def _validate(self, batch: list[tuple[int, dict | None]]) -> list[UserImportRow]:
+        users = []
+        for line_number, row in batch:
+            if row is None:
+                self.result.add_error(f"line {line_number}: not a JSON object")
+                continue
+            try:
+                users.append(UserImportRow.model_validate(row))
+            except ValidationError as exc:
+                fields = ", ".join(
+                    ".".join(map(str, error["loc"])) for error in exc.errors()
+                )
+                self.result.add_error(f"line {line_number}: invalid {fields}")
+        return users
+
+    def _dedupe(self, users: list[UserImportRow]) -> list[UserImportRow]:
+        emails_by_shard: dict[Session, set[str]] = {}
+        for user in users:
+            emails_by_shard.setdefault(self.shards.for_email(user.email), set()).add(
+                user.email
+            )
+        taken_emails = set()
+        for db, emails in emails_by_shard.items():
+            taken_emails.update(
+                db.scalars(select(User.email).where(User.email.in_(emails)))
+            )
+
+        taken = taken_usernames(self.shards, {user.username for user in users})
+
+        unique = []
+        for user in users:
+            if (
+                user.email in taken_emails
+                or user.email in self._seen_emails
+                or user.username in taken
+                or user.username in self._seen_usernames
+            ):
+                self.result.duplicates += 1
+                continue
+            self._seen_emails.add(user.email)
+            self._seen_usernames.add(user.username)
+            unique.append(user)
+        return unique
+
+    def _insert(self, users: list[UserImportRow], hashes: Iterable[str]) -> None:
+        owned, claimed = claim_usernames(
+            self.shards, {user.username: user.email for user in users}
+        )
+        rows_by_shard: dict[Session, list[dict]] = {}
+        for user, password_hash in zip(users, hashes):
+            if user.username not in owned:
+                # Taken by a registration since the batch was deduplicated.
+                self.result.duplicates += 1
+                continue
+            rows_by_shard.setdefault(self.shards.for_email(user.email), []).append(
+                {
+                    "email": user.email,
+                    "username": user.username,
+                    "password": password_hash,
+                    "verified": user.verified,
+                }
+            )
+
+        for db, rows in rows_by_shard.items():
+            stmt = insert_ignoring_conflicts(db, User).returning(
+                User.id, User.email, User.username, User.verified
+            )
+            inserted = db.execute(stmt, rows).all()
+            # Rows that lost a race with a concurrent registration were skipped.
+            self.result.duplicates += len(rows) - len(inserted)
+            self.result.inserted += len(inserted)
+
+            self._insert_otps(db, inserted)
+            db.commit()
+            for user in inserted:
+                known_emails.add(user.email)
+
+            skipped = {row["username"] for row in rows} - {
+                user.username for user in inserted
+            }
+            release_usernames(self.shards, skipped & claimed)
+
+    def _insert_otps(self, db: Session, users) -> None:
+        """Create the OTP row every user needs for request-otp/forgot-password.
+
+        Users that should receive a verification email get a live code;
+        everyone else gets an already-expired placeholder.
+        """
+        live = {
+            user.id for user in users if self.send_verification and not user.verified
+        }
+        pending = {user.id: user for user in users}
+        while pending:
+            codes = set()
+            rows = []
+            for user_id in pending:
+                while (code := generate_otp()) in codes:
+                    pass
+                codes.add(code)
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "otp": code,
+                        "used": user_id not in live,
+                        "expiration": get_expiration_time(
+                            VERIFICATION_OTP_EXPIRE_MINUTES
+                        )
+                        if user_id in live
+                        else get_time(),
+                    }
+                )
+            stmt = insert_ignoring_conflicts(db, UserOTP).returning(
+                UserOTP.user_id, UserOTP.otp
+            )
+            # Codes that collide with existing OTPs are retried with new ones.
+            for user_id, code in db.execute(stmt, rows):
+                user = pending.pop(user_id)
+                if user_id in live:
+                    self.result.verification_emails.append(
+                        (user.email, user.username, code)
+                    )
+
+
+def import_users(
+    shards: ShardSessions,
+    stream: TextIO,
+    fmt: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    pool: "Executor | None" = None,
+    hash_workers: int = HASH_POOL_WORKERS,
+    send_verification: bool = False,
+) -> ImportResult:
+    importer = UserImporter(
+        shards,
+        batch_size=batch_size,
+        pool=pool,
+        hash_workers=hash_workers,
+        send_verification=send_verification,
+    )
+    return importer.run(read_rows(stream, fmt))
+
+
+async def send_verification_emails(
+    entries: list[tuple[str, str, int]], batch_size: int = 100
+) -> int:
+    """Mail verification codes in pipelined batches. Returns the failure count."""
+    from app.email_handler import AsyncSMTPError
+
+    email_handler = get_async_email_handler()
+    valid_time = f"{VERIFICATION_OTP_EXPIRE_MINUTES // 60} hours"
+    failures = 0
+    for start in range(0, len(entries), batch_size):
+        batch = entries[start : start + batch_size]
+        try:
+            rejected = await email_handler.send_many(
+                (
+                    email,
+                    EmailType.OTP,
+                    {"otp": otp, "valid_time": valid_time, "username": username},
+                )
+                for email, username, otp in batch
+            )
+        except (AsyncSMTPError, OSError, TimeoutError):
+            failures += len(batch)
+        else:
+            failures += len(rejected)
+    return failures
@@ -6,6 +6,10 @@ def generate_random_string(length: int = 8) -> str:
     return secrets.token_urlsafe(length)
 
 
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
 def get_time():
     return datetime.now(timezone.utc)
 
@@ -0,0 +1,276 @@
+"""Benchmark the email subsystem against a local SMTP sink.
+
+Sends every registered ``EmailType`` through ``EmailHandler.send_email`` and
+reports per-phase latency (template render, SMTP handshake, message send)
+and overall throughput. Run from the repository root::
+
+    python -m benchmarks.email_benchmark --count 200 --concurrency 8
+    python -m benchmarks.email_benchmark --rate 50 --latency 0.005
+    python -m benchmarks.email_benchmark --async-batch 20 --concurrency 8
+
+With ``--async-batch`` the emails are sent through
+``AsyncEmailHandler.send_many`` in pipelined batches instead; only batch
+latency and throughput are reported in that mode.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .smtp_sink import SMTPSink
+
+DEFAULT_TEMPLATE_ARGS = {
+    "otp": 12345678,
+    "valid_time": "10 minutes",
+    "username": "benchmark-user",
+}
+
+
+def configure_environment(host: str, port: int) -> None:
+    """Point the email settings at the sink before the handler is imported."""
+    os.environ.update(
+        {
+            "SMTP_HOST": host,
+            "SMTP_PORT": str(port),
+            "SMTP_USER": "benchmark",
+            "SMTP_PASSWORD": "benchmark",
+            "SENDER_EMAIL": "noreply@example.com",
+            "SMTP_STARTTLS": "false",
+        }
+    )
+
+
+def make_timed_handler():
+    from app.email_handler import EmailHandler
+
+    class TimedEmailHandler(EmailHandler):
+        """Records how long each phase of ``send_email`` takes per thread."""
+
+        def __init__(self):
+            super().__init__()
+            self.timings = threading.local()
+
+        def build_message(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().build_message(*args, **kwargs)
+            finally:
+                self.timings.render = time.perf_counter() - start
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                self.timings.handshake = time.perf_counter() - start
+
+    return TimedEmailHandler()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def selected_types(types: list[str] | None) -> list:
+    from app.email_handler import TemplateRegistry
+
+    return [
+        email_type
+        for email_type in TemplateRegistry.get_registered_types()
+        if not types or email_type.value in types
+    ]
+
+
+def run(count: int, concurrency: int, rate: float, types: list[str] | None) -> dict:
+    from app.email_handler import EmailType
+
+    handler = make_timed_handler()
+    jobs = [email_type for email_type in selected_types(types) for _ in range(count)]
+    samples: dict[EmailType, dict[str, list[float]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    errors: dict[EmailType, int] = defaultdict(int)
+    samples_lock = threading.Lock()
+
+    def send(index: int, email_type: EmailType) -> None:
+        if rate:
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        start = time.perf_counter()
+        try:
+            handler.send_email(
+                receiver=f"user{index}@example.com",
+                email_type=email_type,
+                **DEFAULT_TEMPLATE_ARGS,
+            )
+        except Exception:
+            with samples_lock:
+                errors[email_type] += 1
+            return
+        total = time.perf_counter() - start
+
+        render = handler.timings.render
+        handshake = handler.timings.handshake
+        with samples_lock:
+            phases = samples[email_type]
+            phases["render"].append(render)
+            phases["handshake"].append(handshake)
+            phases["send"].append(total - render - handshake)
+            phases["total"].append(total)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [
+            executor.submit(send, index, email_type)
+            for index, email_type in enumerate(jobs)
+        ]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed": elapsed,
+        "sent": sum(len(phases["total"]) for phases in samples.values()),
+        "samples": samples,
+        "errors": errors,
+    }
+
+
+async def run_async(
+    count: int, concurrency: int, rate: float, types: list[str] | None, batch: int
+) -> dict:
+    from app.email_handler import AsyncEmailHandler, EmailType
+
+    handler = AsyncEmailHandler()
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: dict[EmailType, dict[str, list[float]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    errors: dict[EmailType, int] = defaultdict(int)
+
+    async def send(index: int, email_type: EmailType) -> None:
+        if rate:
+            await asyncio.sleep(max(0.0, started + index / rate - time.perf_counter()))
+
+        emails = [
+            (f"user{index + offset}@example.com", email_type, DEFAULT_TEMPLATE_ARGS)
+            for offset in range(min(batch, count - index % count))
+        ]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                failed = await handler.send_many(emails)
+            except Exception:
+                errors[email_type] += len(emails)
+                return
+            elapsed = time.perf_counter() - start
+
+        if failed:
+            errors[email_type] += len(failed)
+        samples[email_type]["batch"].append(elapsed)
+        samples[email_type]["sent"].append(len(emails) - len(failed))
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            send(type_index * count + offset, email_type)
+            for type_index, email_type in enumerate(selected_types(types))
+            for offset in range(0, count, batch)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed": elapsed,
+        "sent": sum(sum(phases.pop("sent", [])) for phases in samples.values()),
+        "samples": samples,
+        "errors": errors,
+    }
+
+
+def print_report(result: dict, sink: SMTPSink) -> None:
+    print(
+        f"{'type':<16}{'phase':<11}{'mean ms':>10}{'p50 ms':>10}"
+        f"{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for email_type, phases in result["samples"].items():
+        for phase, values in phases.items():
+            print(
+                f"{email_type.value:<16}{phase:<11}"
+                f"{statistics.fmean(values) * 1000:>10.3f}"
+                f"{percentile(values, 50) * 1000:>10.3f}"
+                f"{percentile(values, 95) * 1000:>10.3f}"
+                f"{percentile(values, 99) * 1000:>10.3f}"
+            )
+
+    for email_type, count in result["errors"].items():
+        print(f"{email_type.value}: {count} failed sends")
+
+    print(
+        f"\nsent={result['sent']} elapsed={result['elapsed']:.3f}s "
+        f"throughput={result['sent'] / result['elapsed']:.1f} msg/s "
+        f"sink_connections={sink.stats.connections} "
+        f"sink_messages={sink.stats.messages}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--count", type=int, default=100, help="Messages to send per email type."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Number of sending threads."
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Target send rate in messages/second (0 sends as fast as possible).",
+    )
+    parser.add_argument(
+        "--types",
+        nargs="*",
+        help="Email type values to benchmark (defaults to every registered type).",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds the sink waits before each reply, to simulate a remote relay.",
+    )
+    parser.add_argument(
+        "--async-batch",
+        type=int,
+        default=0,
+        help="Send with AsyncEmailHandler.send_many in batches of this size.",
+    )
+    args = parser.parse_args()
+
+    with SMTPSink(latency=args.latency) as sink:
+        configure_environment(sink.host, sink.port)
+        if args.async_batch:
+            result = asyncio.run(
+                run_async(
+                    args.count,
+                    args.concurrency,
+                    args.rate,
+                    args.types,
+                    args.async_batch,
+                )
+            )
+        else:
+            result = run(args.count, args.concurrency, args.rate, args.types)
+    print_report(result, sink)
+
+
+if __name__ == "__main__":
+    main()
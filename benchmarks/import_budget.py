@@ -0,0 +1,109 @@
+"""Check that importing the app stays within an import-time budget.
+
+Imports ``app.main`` in a fresh interpreter under ``-X importtime`` (with no
+SMTP settings, to prove importing has no configuration side effects) and
+fails if the cumulative import time exceeds the budget or if a module that
+should only load on first use was imported eagerly. The test suite enforces
+both (``tests/test_import_budget.py``); run this by hand to see which
+modules are slowest::
+
+    python -m benchmarks.import_budget --budget-ms 1500
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Modules that belong to lazily initialized subsystems.
+LAZY_MODULES = (
+    "smtplib",
+    "jinja2",
+    "app.email_handler.email_handler",
+    "app.email_handler.async_email_handler",
+    "app.email_handler.templates",
+    "concurrent.futures.process",
+    "gunicorn",
+)
+
+DEFAULT_BUDGET_MS = 1500.0
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def measure(module: str) -> dict[str, tuple[int, int]]:
+    """Return ``{module: (self_us, cumulative_us)}`` for one cold import."""
+    env = {
+        key: value for key, value in os.environ.items() if not key.startswith("SMTP_")
+    }
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if match := IMPORT_TIME_LINE.match(line):
+            timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return timings
+
+
+def median_import_ms(runs: list[dict[str, tuple[int, int]]], module: str) -> float:
+    return statistics.median(timings[module][1] / 1000 for timings in runs)
+
+
+def eager_imports(timings: dict[str, tuple[int, int]]) -> list[str]:
+    """Modules in ``timings`` that should only load on first use."""
+    return sorted(
+        name
+        for name in timings
+        if any(name == lazy or name.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="Maximum median cumulative import time of --module.",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Imports to take the median of."
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="Slowest modules to list (by self time)."
+    )
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    median_ms = median_import_ms(runs, args.module)
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)
+    print(f"Slowest modules importing {args.module}:")
+    for name, (self_us, _) in slowest[: args.top]:
+        print(f"  {self_us / 1000:8.2f} ms  {name}")
+
+    failed = False
+    eager = eager_imports(runs[-1])
+    if eager:
+        failed = True
+        print(f"\nImported eagerly but should load on first use: {', '.join(eager)}")
+
+    print(
+        f"\n{args.module}: median {median_ms:.1f} ms (budget {args.budget_ms:.0f} ms)"
+    )
+    if median_ms > args.budget_ms:
+        failed = True
+        print("Import time budget exceeded.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Compare response serialization before and after typed response models.
+
+Builds two in-process apps serving the auth endpoints' response shapes with
+fixed payloads, so database and password hashing time don't drown out the
+difference:
+
+* ``before``: token and message endpoints return plain dicts (no response
+  model, so ``jsonable_encoder`` + ``json.dumps``), ``/me`` validates an ORM
+  object through ``GetUserDTO`` and responses render through
+  ``JSONResponse``, as FastAPI did before 0.130.
+* ``after``: every endpoint returns a typed model with a ``response_model``
+  and the default response class, so FastAPI serializes straight to JSON
+  bytes with pydantic-core; ``/me`` still builds (and validates) its DTO.
+
+Requests are driven through the ASGI interface directly (no network). Run
+from the repository root::
+
+    python -m benchmarks.serialization_benchmark --requests 20000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.schemas import GetUserDTO, MessageResponse, TokenResponse
+
+TOKEN = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "x" * 120 + ".signature"
+USER = SimpleNamespace(id=1048577, email="benchmark@example.com", username="bench")
+MESSAGE = "If the email exists, a password reset code has been sent."
+
+# (method, path, response kind)
+ENDPOINTS = (
+    ("POST", "/auth/login", "token"),
+    ("POST", "/auth/verify", "token"),
+    ("GET", "/auth/refresh_token", "token"),
+    ("GET", "/auth/me", "user"),
+    ("POST", "/auth/request-otp", "message"),
+    ("POST", "/auth/forgot-password", "message"),
+    ("POST", "/auth/reset-password", "message"),
+)
+
+
+def build_before_app() -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+    for method, path, kind in ENDPOINTS:
+        if kind == "token":
+
+            async def endpoint():
+                return {"access_token": TOKEN, "token_type": "bearer"}
+
+            app.add_api_route(path, endpoint, methods=[method])
+        elif kind == "user":
+
+            async def endpoint():
+                return USER
+
+            app.add_api_route(
+                path, endpoint, methods=[method], response_model=GetUserDTO
+            )
+        else:
+
+            async def endpoint():
+                return {"message": MESSAGE}
+
+            app.add_api_route(path, endpoint, methods=[method])
+    return app
+
+
+def build_after_app() -> FastAPI:
+    app = FastAPI()
+    for method, path, kind in ENDPOINTS:
+        if kind == "token":
+
+            async def endpoint():
+                return TokenResponse(access_token=TOKEN)
+
+            model = TokenResponse
+        elif kind == "user":
+
+            async def endpoint():
+                return GetUserDTO(id=USER.id, email=USER.email, username=USER.username)
+
+            model = GetUserDTO
+        else:
+
+            async def endpoint():
+                return MessageResponse(message=MESSAGE)
+
+            model = MessageResponse
+        app.add_api_route(path, endpoint, methods=[method], response_model=model)
+    return app
+
+
+async def call(app: FastAPI, method: str, path: str) -> bytes:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 1),
+        "server": ("benchmark", 80),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def time_requests(app: FastAPI, method: str, path: str, requests: int) -> float:
+    """Mean microseconds per request over ``requests`` sequential requests."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, method, path)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(requests: int, rounds: int) -> list[tuple[str, float, float]]:
+    before, after = build_before_app(), build_after_app()
+    results = []
+    for method, path, _ in ENDPOINTS:
+        assert await call(before, method, path) == await call(after, method, path)
+        # Alternate the apps round by round so drift affects both equally.
+        before_us, after_us = [], []
+        for _ in range(rounds):
+            before_us.append(await time_requests(before, method, path, requests))
+            after_us.append(await time_requests(after, method, path, requests))
+        results.append(
+            (
+                f"{method} {path}",
+                statistics.median(before_us),
+                statistics.median(after_us),
+            )
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--requests", type=int, default=5000, help="Requests per endpoint per round."
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="Rounds to take the median of."
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.rounds))
+    print(f"{'endpoint':<28} {'before µs':>10} {'after µs':>10} {'speedup':>8}")
+    for name, before_us, after_us in results:
+        print(
+            f"{name:<28} {before_us:>10.1f} {after_us:>10.1f} "
+            f"{before_us / after_us:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""A minimal local SMTP server that accepts and discards every message.
+
+Used by the benchmarks and tests to exercise the mail path without a real
+relay. It speaks just enough ESMTP for ``smtplib`` and the app's senders:
+EHLO/HELO, AUTH PLAIN/LOGIN (any credentials are accepted), MAIL, RCPT,
+DATA, RSET, NOOP and QUIT, and it advertises PIPELINING unless told not to.
+It can also be told to refuse some recipients or every DATA command.
+"""
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SinkStats:
+    connections: int = 0
+    messages: int = 0
+    bytes_received: int = 0
+    recipients: list[str] = field(default_factory=list)
+
+
+class SMTPSink:
+    """Run an SMTP sink on a background thread.
+
+    Usage::
+
+        with SMTPSink() as sink:
+            ...  # send mail to sink.host:sink.port
+        print(sink.stats.messages)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        keep_recipients: bool = False,
+        pipelining: bool = True,
+        reject_recipients: frozenset[str] = frozenset(),
+        reject_data: bool = False,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.keep_recipients = keep_recipients
+        self.pipelining = pipelining
+        self.reject_recipients = reject_recipients
+        self.reject_data = reject_data
+        self.stats = SinkStats()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.Server | None = None
+        self._thread: threading.Thread | None = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SMTPSink":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            # Connections stalled by ``latency`` would keep wait_closed() waiting.
+            self._server.close_clients()
+            self._loop.run_until_complete(self._server.wait_closed())
+            # Cancel the handlers of the closed connections so none is left
+            # pending when the loop closes.
+            self._loop.run_until_complete(self._cancel_handlers())
+            self._loop.close()
+
+    async def _cancel_handlers(self) -> None:
+        handlers = asyncio.all_tasks() - {asyncio.current_task()}
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        with self._lock:
+            self.stats.connections += 1
+        try:
+            await self._reply(writer, "220 localhost SMTP sink ready")
+            # Recipients accepted for the current message.
+            accepted = 0
+            while line := await reader.readline():
+                command, _, argument = line.decode().rstrip("\r\n").partition(" ")
+                command = command.upper()
+
+                if command == "EHLO":
+                    writer.write(
+                        b"250-localhost\r\n"
+                        + (b"250-PIPELINING\r\n" if self.pipelining else b"")
+                        + b"250-8BITMIME\r\n"
+                        b"250 AUTH PLAIN LOGIN\r\n"
+                    )
+                    await writer.drain()
+                elif command == "AUTH":
+                    await self._auth(reader, writer, argument)
+                elif command == "RCPT":
+                    address = argument.partition(":")[2].strip("<> ")
+                    if address in self.reject_recipients:
+                        await self._reply(writer, "550 No such user")
+                        continue
+                    accepted += 1
+                    if self.keep_recipients:
+                        with self._lock:
+                            self.stats.recipients.append(argument)
+                    await self._reply(writer, "250 OK")
+                elif command == "DATA":
+                    if self.reject_data:
+                        await self._reply(writer, "554 Transaction failed")
+                        continue
+                    if not accepted:
+                        await self._reply(writer, "554 No valid recipients")
+                        continue
+                    accepted = 0
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    size = 0
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        size += len(chunk)
+                    with self._lock:
+                        self.stats.messages += 1
+                        self.stats.bytes_received += size
+                    await self._reply(writer, "250 OK queued")
+                elif command == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                elif command in ("HELO", "MAIL", "RSET", "NOOP"):
+                    if command in ("MAIL", "RSET"):
+                        accepted = 0
+                    await self._reply(writer, "250 OK")
+                else:
+                    await self._reply(writer, "502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _auth(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        argument: str,
+    ) -> None:
+        mechanism, _, initial = argument.partition(" ")
+        mechanism = mechanism.upper()
+        if mechanism == "PLAIN" and not initial:
+            await self._reply(writer, "334 ")
+            await reader.readline()
+        elif mechanism == "LOGIN":
+            if not initial:
+                await self._reply(writer, "334 VXNlcm5hbWU6")
+                await reader.readline()
+            await self._reply(writer, "334 UGFzc3dvcmQ6")
+            await reader.readline()
+        await self._reply(writer, "235 Authentication successful")
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds to delay each reply."
+    )
+    args = parser.parse_args()
+
+    with SMTPSink(args.host, args.port, args.latency) as sink:
+        print(f"SMTP sink listening on {sink.host}:{sink.port}")
+        try:
+            while True:
+                time.sleep(5)
+                print(
+                    f"connections={sink.stats.connections} "
+                    f"messages={sink.stats.messages} "
+                    f"bytes={sink.stats.bytes_received}"
+                )
+        except KeyboardInterrupt:
+            pass
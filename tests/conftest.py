@@ -0,0 +1,80 @@
+"""Shared fixtures.
+
+Settings are read when the app modules are imported, so the environment is
+pinned here, before any test imports them: the app runs unsharded against a
+throwaway SQLite database with mail unconfigured. Tests that need mail or
+shards configure them through the fixtures below.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="app-tests-")
+ADMIN_KEY = "test-admin-key"
+
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{TEST_DIR}/app.db",
+        "SHARD_DATABASE_URLS": "",
+        "ADMIN_API_KEY": ADMIN_KEY,
+        "HASH_POOL_WORKERS": "2",
+    }
+)
+for name in (
+    "SMTP_HOST",
+    "SMTP_PORT",
+    "SMTP_USER",
+    "SMTP_PASSWORD",
+    "SENDER_EMAIL",
+    "IDEMPOTENCY_REDIS_URL",
+):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def database():
+    """Give the test an empty schema in the app's default database."""
+    from app.db import engine
+    from app.models import Base
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def smtp_sink():
+    from benchmarks.smtp_sink import SMTPSink
+
+    with SMTPSink(keep_recipients=True) as sink:
+        yield sink
+
+
+@pytest.fixture
+def smtp_settings(smtp_sink, monkeypatch):
+    """Point the mail settings at ``smtp_sink``."""
+    from app.email_handler import get_async_email_handler
+    from app.settings import get_settings
+
+    for name, value in {
+        "SMTP_HOST": smtp_sink.host,
+        "SMTP_PORT": str(smtp_sink.port),
+        "SMTP_USER": "test",
+        "SMTP_PASSWORD": "test",
+        "SENDER_EMAIL": "noreply@example.com",
+        "SMTP_STARTTLS": "false",
+    }.items():
+        monkeypatch.setenv(name, value)
+    get_settings.cache_clear()
+    get_async_email_handler.cache_clear()
+    yield smtp_sink
+    get_settings.cache_clear()
+    get_async_email_handler.cache_clear()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from app.email_handler import AsyncEmailHandler, EmailType
+from app.email_handler.async_email_handler import AsyncSMTPClient
+from benchmarks.smtp_sink import SMTPSink
+
+pytestmark = pytest.mark.anyio
+
+
+def make_message(*recipients: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = "Test"
+    message.set_content("Hello\n.leading dot\n")
+    return message
+
+
+@pytest.fixture(params=[True, False], ids=["pipelining", "no-pipelining"])
+def sink(request):
+    with SMTPSink(keep_recipients=True, pipelining=request.param) as sink:
+        yield sink
+
+
+async def send(sink: SMTPSink, messages: list[EmailMessage], timeout: float = 5.0):
+    async with AsyncSMTPClient(sink.host, sink.port, timeout=timeout) as client:
+        assert ("PIPELINING" in client.extensions) == sink.pipelining
+        return await client.send_messages(messages)
+
+
+async def test_delivers_a_batch_over_one_connection(sink):
+    messages = [make_message(f"user{i}@example.com") for i in range(5)]
+
+    deliveries = await send(sink, messages)
+
+    assert [delivery.message for delivery in deliveries] == messages
+    assert all(delivery.error is None for delivery in deliveries)
+    assert all(not delivery.refused for delivery in deliveries)
+    assert sink.stats.connections == 1
+    assert sink.stats.messages == 5
+
+
+async def test_refused_recipient_does_not_stop_the_others(sink):
+    sink.reject_recipients = frozenset({"bad@example.com"})
+
+    [delivery] = await send(sink, [make_message("good@example.com", "bad@example.com")])
+
+    assert delivery.error is None
+    assert list(delivery.refused) == ["bad@example.com"]
+    assert delivery.refused["bad@example.com"].code == 550
+    assert sink.stats.messages == 1
+    assert sink.stats.recipients == ["TO:<good@example.com>"]
+
+
+async def test_message_with_every_recipient_refused_fails_alone(sink):
+    sink.reject_recipients = frozenset({"bad@example.com"})
+    messages = [
+        make_message("bad@example.com"),
+        make_message("good@example.com"),
+        make_message("bad@example.com"),
+    ]
+
+    deliveries = await send(sink, messages)
+
+    assert [delivery.error and delivery.error.code for delivery in deliveries] == [
+        550,
+        None,
+        550,
+    ]
+    assert sink.stats.messages == 1
+
+
+async def test_rejected_data_is_reported_per_message(sink):
+    sink.reject_data = True
+
+    deliveries = await send(sink, [make_message("a@example.com")] * 2)
+
+    assert [delivery.error.code for delivery in deliveries] == [554, 554]
+    assert sink.stats.messages == 0
+
+
+async def test_times_out_on_a_stalled_server():
+    with SMTPSink(latency=1.0) as sink:
+        client = AsyncSMTPClient(sink.host, sink.port, timeout=0.2)
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await client.connect()
+        assert time.monotonic() - started < 1.0
+        client.close()
+
+
+async def test_times_out_while_sending(smtp_sink):
+    async with AsyncSMTPClient(smtp_sink.host, smtp_sink.port, timeout=0.2) as client:
+        smtp_sink.latency = 1.0
+        with pytest.raises(TimeoutError):
+            await client.send_messages([make_message("a@example.com")])
+
+
+async def test_send_many_reports_refused_receivers(smtp_settings):
+    smtp_settings.reject_recipients = frozenset({"gone@example.com"})
+    handler = AsyncEmailHandler()
+    template_args = {"otp": 12345678, "valid_time": "1 hour", "username": "u"}
+
+    rejected = await handler.send_many(
+        (receiver, EmailType.OTP, template_args)
+        for receiver in ("a@example.com", "gone@example.com", "b@example.com")
+    )
+
+    assert [(receiver, error.code) for receiver, error in rejected] == [
+        ("gone@example.com", 550)
+    ]
+    assert smtp_settings.stats.messages == 2
+
+
+async def test_cancelled_connect_does_not_wait_for_the_server(smtp_settings):
+    smtp_settings.latency = 5.0
+    handler = AsyncEmailHandler()
+
+    task = asyncio.create_task(handler.connect())
+    await asyncio.sleep(0.1)
+    started = time.monotonic()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert time.monotonic() - started < 1.0
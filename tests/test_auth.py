@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from app.api import auth
+from app.models import User, UserOTP
+
+
+@pytest.fixture
+def client(database, smtp_settings):
+    from app.main import app
+
+    return TestClient(app)
+
+
+def register(client, username="alice", email="alice@example.com"):
+    return client.post(
+        "/auth/register",
+        json={"username": username, "email": email, "password": "secret"},
+    )
+
+
+def test_register(client, database):
+    response = register(client)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body == {"id": body["id"], "email": "alice@example.com", "username": "alice"}
+    with database.connect() as connection:
+        assert connection.scalar(select(UserOTP.user_id)) == body["id"]
+
+
+@pytest.mark.parametrize(
+    ("username", "email", "detail"),
+    [
+        ("alice", "other@example.com", "Username already exists"),
+        ("other", "alice@example.com", "Email already exists"),
+    ],
+)
+def test_register_conflicts(client, username, email, detail):
+    register(client)
+
+    response = register(client, username, email)
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": detail}
+
+
+def test_register_redraws_an_otp_held_by_another_user(client, database, monkeypatch):
+    codes = iter([11111111, 11111111, 22222222])
+    monkeypatch.setattr(auth, "generate_otp", lambda: next(codes))
+
+    assert register(client).status_code == 200
+    response = register(client, "bob", "bob@example.com")
+
+    assert response.status_code == 200
+    with database.connect() as connection:
+        otps = dict(
+            connection.execute(
+                select(User.username, UserOTP.otp).join(
+                    UserOTP, UserOTP.user_id == User.id
+                )
+            ).all()
+        )
+    assert otps == {"alice": 11111111, "bob": 22222222}
+
+
+def test_me_returns_the_registered_user(client, database):
+    registered = register(client).json()
+    with database.begin() as connection:
+        connection.execute(update(User).values(verified=True))
+    token = client.post(
+        "/auth/login", json={"email": "alice@example.com", "password": "secret"}
+    ).json()["access_token"]
+
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json() == registered
@@ -0,0 +1,43 @@
+import smtplib
+from email.message import EmailMessage
+
+from benchmarks.email_benchmark import percentile, run
+
+
+def test_sink_accepts_and_counts_messages(smtp_sink):
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = "a@example.com, b@example.com"
+    message["Subject"] = "Hello"
+    message.set_content("Hi")
+
+    with smtplib.SMTP(smtp_sink.host, smtp_sink.port) as server:
+        server.ehlo()
+        assert server.has_extn("pipelining")
+        server.login("any", "thing")
+        server.send_message(message)
+        server.send_message(message)
+
+    assert smtp_sink.stats.connections == 1
+    assert smtp_sink.stats.messages == 2
+    assert (
+        smtp_sink.stats.recipients == ["to:<a@example.com>", "to:<b@example.com>"] * 2
+    )
+
+
+def test_benchmark_sends_every_type_through_the_sink(smtp_settings):
+    result = run(count=3, concurrency=2, rate=0.0, types=None)
+
+    assert not result["errors"]
+    assert result["sent"] == 3 * len(result["samples"])
+    assert smtp_settings.stats.messages == result["sent"]
+    for phases in result["samples"].values():
+        assert set(phases) == {"render", "handshake", "send", "total"}
+        assert len(phases["total"]) == 3
+
+
+def test_percentile():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert percentile([1.0], 95) == 1.0
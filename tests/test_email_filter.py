@@ -0,0 +1,142 @@
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.api import auth
+from app.auth_utils import hash_password
+from app.email_filter import KnownEmailFilter
+from app.models import User
+
+PASSWORD = "secret"
+
+# Stands in for another worker or the CLI importer: a separate interpreter
+# writing to the same database, which this process's filter never hears of.
+INSERT_FROM_ANOTHER_PROCESS = """
+import sys
+from sqlalchemy import insert
+from app.auth_utils import hash_password
+from app.db import engine
+from app.models import User
+
+with engine.begin() as connection:
+    connection.execute(
+        insert(User).values(
+            email=sys.argv[1],
+            username=sys.argv[1].split("@")[0],
+            password=hash_password(sys.argv[2]),
+            verified=True,
+        )
+    )
+"""
+
+
+class SharedFilter(KnownEmailFilter):
+    covers_all_writes = True
+
+
+def add_user(engine, email):
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User).values(
+                email=email,
+                username=email.split("@")[0],
+                password=hash_password(PASSWORD),
+                verified=True,
+            )
+        )
+
+
+def login(client, email):
+    return client.post("/auth/login", json={"email": email, "password": PASSWORD})
+
+
+@pytest.fixture
+def email_filter(database, monkeypatch):
+    email_filter = KnownEmailFilter(capacity=100, error_rate=0.01)
+    monkeypatch.setattr(auth, "known_emails", email_filter)
+    return email_filter
+
+
+@pytest.fixture
+def client(database, smtp_settings):
+    from app.main import app
+
+    return TestClient(app)
+
+
+def test_filter_answers_for_the_emails_it_was_built_from(database):
+    add_user(database, "alice@example.com")
+    email_filter = KnownEmailFilter(capacity=100, error_rate=0.01)
+
+    assert email_filter.might_exist("nobody@example.com")
+    assert email_filter.rebuild() == 1
+    assert email_filter.might_exist("Alice@Example.com")
+    assert not email_filter.might_exist("nobody@example.com")
+    # A per-process filter never vouches for a miss.
+    assert not email_filter.rules_out("nobody@example.com")
+
+
+def test_refresh_picks_up_new_users(database):
+    email_filter = KnownEmailFilter(capacity=100, error_rate=0.01)
+    email_filter.rebuild()
+    add_user(database, "late@example.com")
+
+    assert email_filter.refresh() == 1
+    assert email_filter.might_exist("late@example.com")
+
+
+def test_login_before_the_filter_is_built(email_filter, client, database):
+    add_user(database, "alice@example.com")
+
+    assert not email_filter.ready
+    assert login(client, "alice@example.com").status_code == 200
+
+
+def test_login_on_a_filter_hit(email_filter, client, database):
+    add_user(database, "alice@example.com")
+    email_filter.rebuild()
+
+    assert email_filter.might_exist("alice@example.com")
+    assert login(client, "alice@example.com").status_code == 200
+
+
+def test_login_on_a_filter_miss_for_an_unknown_email(email_filter, client):
+    email_filter.rebuild()
+
+    response = login(client, "nobody@example.com")
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid credentials"}
+
+
+def test_user_created_by_another_process_is_served(email_filter, client, smtp_sink):
+    email_filter.rebuild()
+    email = "carol@example.com"
+    subprocess.run(
+        [sys.executable, "-c", INSERT_FROM_ANOTHER_PROCESS, email, PASSWORD],
+        check=True,
+    )
+    assert not email_filter.might_exist(email)
+
+    assert login(client, email).status_code == 200
+    response = client.post("/auth/forgot-password", json={"email": email})
+    assert response.status_code == 200
+    response = client.post("/auth/request-otp", params={"email": email})
+    assert response.json() == {"message": "OTP sent"}
+    assert smtp_sink.stats.recipients == [f"TO:<{email}>"] * 2
+
+
+def test_filter_covering_every_write_skips_the_lookup(database, client, monkeypatch):
+    email_filter = SharedFilter(capacity=100, error_rate=0.01)
+    email_filter.rebuild()
+    monkeypatch.setattr(auth, "known_emails", email_filter)
+    dummy_checks = []
+    monkeypatch.setattr(auth, "verify_dummy_password", dummy_checks.append)
+    # Only reachable by skipping the database, which has the user.
+    add_user(database, "alice@example.com")
+
+    assert login(client, "alice@example.com").status_code == 401
+    assert dummy_checks == [PASSWORD]
@@ -0,0 +1,177 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+
+from app.idempotency import (
+    IN_PROGRESS,
+    MAX_BODY_BYTES,
+    IdempotencyMiddleware,
+    IdempotencyStoreFull,
+    InMemoryIdempotencyStore,
+    StoredResponse,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class Handler:
+    """Endpoint that counts its calls and answers with a chosen status."""
+
+    def __init__(self):
+        self.calls = 0
+        self.entered = asyncio.Event()
+        self.release: asyncio.Event | None = None
+
+    async def __call__(self, request: Request) -> Response:
+        self.calls += 1
+        self.entered.set()
+        if self.release is not None:
+            await self.release.wait()
+        status = int(request.query_params.get("status", 200))
+        body = await request.body()
+        return Response(f"call {self.calls}: ".encode() + body, status_code=status)
+
+
+@pytest.fixture
+def handler():
+    return Handler()
+
+
+@pytest.fixture
+def store():
+    return InMemoryIdempotencyStore(ttl_seconds=60, max_entries=100)
+
+
+@pytest.fixture
+async def client(handler, store):
+    app = FastAPI()
+    app.add_api_route("/op", handler, methods=["POST"])
+    app.add_middleware(IdempotencyMiddleware, store=store, paths={"/op"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+def post(client, key="key-1", content=b"payload", **kwargs):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post("/op", content=content, headers=headers, **kwargs)
+
+
+async def test_repeat_is_replayed(client, handler):
+    first = await post(client)
+    second = await post(client)
+
+    assert handler.calls == 1
+    assert second.status_code == first.status_code == 200
+    assert second.content == first.content == b"call 1: payload"
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+
+async def test_requests_without_a_key_always_run(client, handler):
+    await post(client, key=None)
+    await post(client, key=None)
+
+    assert handler.calls == 2
+
+
+async def test_key_reused_for_another_request_is_rejected(client, handler):
+    await post(client)
+
+    response = await post(client, content=b"something else")
+
+    assert response.status_code == 422
+    assert handler.calls == 1
+
+
+async def test_repeat_while_first_is_running_gets_409(client, handler):
+    handler.release = asyncio.Event()
+    first = asyncio.create_task(post(client))
+    await handler.entered.wait()
+
+    concurrent = await post(client)
+    handler.release.set()
+    first = await first
+    replayed = await post(client)
+
+    assert concurrent.status_code == 409
+    assert first.status_code == 200
+    assert replayed.content == first.content
+    assert handler.calls == 1
+
+
+@pytest.mark.parametrize("status", [201, 400, 404, 409])
+async def test_success_and_business_errors_are_stored(client, handler, status):
+    await post(client, params={"status": status})
+    response = await post(client, params={"status": status})
+
+    assert response.status_code == status
+    assert handler.calls == 1
+
+
+@pytest.mark.parametrize("status", [401, 403, 422, 429, 500, 503])
+async def test_other_failures_release_the_key(client, handler, status):
+    await post(client, params={"status": status})
+    response = await post(client, params={"status": status})
+
+    assert "idempotent-replayed" not in response.headers
+    assert handler.calls == 2
+
+
+async def test_stored_response_expires(handler):
+    store = InMemoryIdempotencyStore(ttl_seconds=0.05, max_entries=100)
+    app = FastAPI()
+    app.add_api_route("/op", handler, methods=["POST"])
+    app.add_middleware(IdempotencyMiddleware, store=store, paths={"/op"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+        await post(client)
+        await asyncio.sleep(0.1)
+        response = await post(client)
+
+    assert response.content == b"call 2: payload"
+
+
+async def test_oversized_body_is_refused(client, handler):
+    response = await post(client, content=b"x" * (MAX_BODY_BYTES + 1))
+    assert response.status_code == 413
+
+    async def chunked():
+        for _ in range(3):
+            yield b"x" * (MAX_BODY_BYTES // 2)
+
+    response = await post(client, content=chunked())
+    assert response.status_code == 413
+    assert handler.calls == 0
+
+
+async def test_eviction_keeps_reservations_of_running_requests():
+    store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=2)
+    response = StoredResponse(fingerprint="f", status=200, headers=[], body=b"")
+
+    assert await store.reserve("a")
+    assert await store.reserve("b")
+    with pytest.raises(IdempotencyStoreFull):
+        await store.reserve("c")
+
+    await store.save("a", response)
+    assert await store.reserve("c")
+    assert await store.get("a") is None
+    assert await store.get("b") is IN_PROGRESS
+    assert await store.get("c") is IN_PROGRESS
+
+
+async def test_full_store_answers_503(handler):
+    store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=1)
+    await store.reserve("/op:running")
+    app = FastAPI()
+    app.add_api_route("/op", handler, methods=["POST"])
+    app.add_middleware(IdempotencyMiddleware, store=store, paths={"/op"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+        response = await post(client)
+
+    assert response.status_code == 503
+    assert handler.calls == 0
@@ -0,0 +1,32 @@
+import pytest
+
+import app.email_handler
+from benchmarks.import_budget import (
+    DEFAULT_BUDGET_MS,
+    eager_imports,
+    measure,
+    median_import_ms,
+)
+
+
+@pytest.fixture(scope="module")
+def runs():
+    return [measure("app.main") for _ in range(3)]
+
+
+def test_app_import_stays_within_budget(runs):
+    assert median_import_ms(runs, "app.main") <= DEFAULT_BUDGET_MS
+
+
+def test_mail_modules_load_on_first_use(runs):
+    for timings in runs:
+        assert "app.main" in timings
+        assert eager_imports(timings) == []
+
+
+def test_lazy_exports_resolve_on_access():
+    from app.email_handler.async_email_handler import AsyncEmailHandler
+
+    assert app.email_handler.AsyncEmailHandler is AsyncEmailHandler
+    with pytest.raises(AttributeError):
+        app.email_handler.NoSuchHandler
@@ -0,0 +1,81 @@
+import dataclasses
+
+import pytest
+
+from app import launcher
+from app.settings import get_settings
+
+LIMIT_KEYS = ("DB_POOL_SIZE", "DB_MAX_OVERFLOW", "HASH_POOL_WORKERS")
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    """Let launcher.main() write the limits without leaking them."""
+    for key in LIMIT_KEYS + ("WEB_CONCURRENCY",):
+        monkeypatch.setenv(key, "")
+        monkeypatch.delenv(key)
+    get_settings.cache_clear()
+    yield monkeypatch
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def captured_options(monkeypatch):
+    options = {}
+
+    def run(self):
+        options.update(self.options)
+
+    monkeypatch.setattr(launcher.ProductionApplication, "run", run)
+    return options
+
+
+def test_resource_limits_split_the_budget(monkeypatch):
+    monkeypatch.setattr(launcher, "CPU_COUNT", 8)
+    settings = dataclasses.replace(get_settings(), db_max_connections=100)
+
+    assert launcher.worker_resource_limits(settings, 4) == {
+        "DB_POOL_SIZE": "25",
+        "DB_MAX_OVERFLOW": "0",
+        "HASH_POOL_WORKERS": "2",
+    }
+    # Never less than one of each, even with more workers than budget.
+    assert launcher.worker_resource_limits(settings, 200) == {
+        "DB_POOL_SIZE": "1",
+        "DB_MAX_OVERFLOW": "0",
+        "HASH_POOL_WORKERS": "1",
+    }
+
+
+def test_main_configures_gunicorn(environment, captured_options):
+    environment.setenv("WEB_CONCURRENCY", "4")
+    environment.setenv("DB_MAX_CONNECTIONS", "40")
+    environment.setenv("MAX_REQUESTS", "1000")
+
+    launcher.main()
+
+    assert captured_options["workers"] == 4
+    assert captured_options["worker_class"] == "app.launcher.Worker"
+    assert captured_options["preload_app"] is True
+    assert captured_options["post_fork"] is launcher.post_fork
+    assert captured_options["max_requests_jitter"] == 100
+    settings = get_settings()
+    assert (settings.db_pool_size, settings.db_max_overflow) == (10, 0)
+
+
+def test_explicit_limits_win_over_the_computed_share(environment, captured_options):
+    environment.setenv("WEB_CONCURRENCY", "4")
+    environment.setenv("DB_POOL_SIZE", "3")
+
+    launcher.main()
+
+    assert get_settings().db_pool_size == 3
+
+
+def test_load_config_skips_unset_options():
+    application = launcher.ProductionApplication(
+        {"workers": 3, "keepalive": None, "not_a_setting": 1}
+    )
+
+    assert application.cfg.workers == 3
+    assert application.cfg.keepalive == application.cfg.settings["keepalive"].default
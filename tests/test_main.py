@@ -0,0 +1,41 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def wait_until_ready(client: TestClient, seconds: float = 10.0):
+    deadline = time.monotonic() + seconds
+    while (response := client.get("/ready")).status_code != 200:
+        assert time.monotonic() < deadline, response.json()
+        time.sleep(0.05)
+    return response
+
+
+def test_health_answers_without_the_lifespan(monkeypatch):
+    monkeypatch.delattr(app.state, "ready", raising=False)
+    client = TestClient(app)
+
+    assert client.get("/health").json() == {"status": "ok"}
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "warming up"}
+
+
+def test_becomes_ready_without_mail_configured(database, caplog):
+    with TestClient(app) as client:
+        response = wait_until_ready(client)
+
+    assert response.json() == {"status": "ready"}
+    assert "Email is unavailable" in caplog.text
+    assert "Warm-up failed" not in caplog.text
+
+
+@pytest.mark.usefixtures("smtp_settings")
+def test_becomes_ready_with_mail_configured(database, caplog):
+    with TestClient(app) as client:
+        wait_until_ready(client)
+
+    assert "Email is unavailable" not in caplog.text
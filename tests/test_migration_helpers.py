@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app.migration_helpers import (
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+ROW_COUNT = 10
+
+metadata = sa.MetaData()
+items = sa.Table(
+    "items",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("kind", sa.String),
+    sa.Column("locale", sa.String),
+)
+
+
+@pytest.fixture
+def connection(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/migrate.db")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            sa.insert(items),
+            [
+                {"id": i, "kind": "a" if i % 2 else "b", "locale": None}
+                for i in range(1, ROW_COUNT + 1)
+            ],
+        )
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+@pytest.fixture
+def migration(connection):
+    """Run the helpers as a revision would, through ``alembic.op``.
+
+    This is the per-revision transaction alembic opens when ``env.py`` sets
+    ``transaction_per_migration``.
+    """
+    context = MigrationContext.configure(
+        connection, opts={"transaction_per_migration": True}
+    )
+    with (
+        Operations.context(context),
+        context.begin_transaction(_per_migration=True),
+    ):
+        yield context
+
+
+def locales(connection):
+    return dict(connection.execute(sa.select(items.c.id, items.c.locale)).all())
+
+
+def index_names(connection):
+    return {index["name"] for index in sa.inspect(connection).get_indexes("items")}
+
+
+def test_backfill_in_batches_with_a_raw_sql_filter(connection, migration):
+    updated = backfill(
+        "items",
+        {"locale": "en"},
+        "kind = 'a' AND locale IS NULL",
+        batch_size=2,
+        pause_seconds=0,
+    )
+
+    assert updated == ROW_COUNT // 2
+    assert locales(connection) == {
+        i: "en" if i % 2 else None for i in range(1, ROW_COUNT + 1)
+    }
+    # Rows already done are excluded, so a rerun has nothing left.
+    assert backfill("items", {"locale": "en"}, "kind = 'a' AND locale IS NULL") == 0
+
+
+def test_backfill_without_a_filter_updates_every_row(connection, migration):
+    assert (
+        backfill("items", {"locale": "fr"}, batch_size=3, pause_seconds=0) == ROW_COUNT
+    )
+    assert set(locales(connection).values()) == {"fr"}
+
+
+def test_backfill_refuses_offline_runs():
+    context = MigrationContext.configure(dialect_name="sqlite", opts={"as_sql": True})
+
+    with Operations.context(context), pytest.raises(RuntimeError, match="--sql"):
+        backfill("items", {"locale": "en"})
+
+
+def test_index_helpers_are_idempotent(connection, migration):
+    for _ in range(2):
+        create_index_concurrently("ix_items_kind", "items", ["kind"])
+    assert "ix_items_kind" in index_names(connection)
+
+    for _ in range(2):
+        drop_index_concurrently("ix_items_kind", "items")
+    assert "ix_items_kind" not in index_names(connection)
+
+
+def test_revisions_upgrade_and_downgrade(tmp_path):
+    def alembic(*args):
+        subprocess.run(
+            [sys.executable, "-m", "alembic", *args],
+            cwd=Path(__file__).parents[1],
+            env=os.environ | {"DATABASE_URL": f"sqlite:///{tmp_path}/app.db"},
+            capture_output=True,
+            check=True,
+        )
+
+    alembic("upgrade", "head")
+    alembic("downgrade", "base")
+    alembic("upgrade", "head")
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/app.db")
+    indexes = {index["name"] for index in sa.inspect(engine).get_indexes("otps")}
+    engine.dispose()
+    assert "ix_otps_user_id" in indexes
@@ -0,0 +1,224 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from app.api import auth
+from app.models import Base, User, UserOTP
+from app.sharding import (
+    ShardRouter,
+    ShardSessions,
+    check_username_claims,
+    claim_usernames,
+    get_shards,
+    release_usernames,
+    reshard_users,
+    taken_usernames,
+)
+from app.utils import get_expiration_time
+from tests.test_main import wait_until_ready
+
+USER_COUNT = 20
+
+
+@pytest.fixture
+def make_router(tmp_path):
+    """Build routers over fresh SQLite shard files, disposed after the test."""
+    routers = []
+
+    def make(name, count):
+        urls = [f"sqlite:///{tmp_path}/{name}{shard}.db" for shard in range(count)]
+        router = ShardRouter(tuple(urls))
+        for engine in router.engines:
+            Base.metadata.create_all(engine)
+        routers.append(router)
+        return router
+
+    yield make
+    for router in routers:
+        for engine in router.engines:
+            engine.dispose()
+
+
+@pytest.fixture
+def router(make_router):
+    return make_router("shard", 2)
+
+
+def email(i):
+    return f"user{i}@example.com"
+
+
+def add_users(router, count=USER_COUNT, claims=True):
+    """Write users straight to the shards their emails hash to."""
+    for i in range(count):
+        shard = router.shard_for_email(email(i))
+        with router.session(shard) as db:
+            user_id = db.execute(
+                insert(User)
+                .values(email=email(i), username=f"user{i}", password="hash")
+                .returning(User.id)
+            ).scalar()
+            db.execute(
+                insert(UserOTP).values(
+                    user_id=user_id,
+                    otp=10_000_000 + i,
+                    expiration=get_expiration_time(10),
+                )
+            )
+            db.commit()
+    if claims:
+        with ShardSessions(router) as shards:
+            claim_usernames(shards, {f"user{i}": email(i) for i in range(count)})
+
+
+def emails_by_shard(router):
+    found = {}
+    for shard in range(router.shard_count):
+        with router.session(shard) as db:
+            found[shard] = set(db.scalars(select(User.email)))
+    return found
+
+
+def test_users_are_routed_by_email(router):
+    placements = {router.shard_for_email(email(i)) for i in range(USER_COUNT)}
+    assert placements == {0, 1}
+    assert router.shard_for_email("User1@Example.com") == router.shard_for_email(
+        email(1)
+    )
+
+    with ShardSessions(router) as shards:
+        db = shards.for_email(email(1))
+        assert db.info["shard"] == router.shard_for_email(email(1))
+        user_id = router.encode_user_id(db.info["shard"], 42)
+        assert shards.for_user_id(user_id) == (db, 42)
+
+
+def test_username_claims_are_unique_across_shards(router):
+    # Usernames owned by each shard, so both claim tables are exercised.
+    names = {router.shard_for_username(f"name{i}"): f"name{i}" for i in range(20)}
+    assert len(names) == 2
+
+    with ShardSessions(router) as shards:
+        claims = {name: f"{name}@example.com" for name in names.values()}
+        assert claim_usernames(shards, claims) == (set(claims), set(claims))
+        # Another email cannot take them; the same email keeps owning them.
+        stolen = {name: "thief@example.com" for name in claims}
+        assert claim_usernames(shards, stolen) == (set(), set())
+        assert claim_usernames(shards, claims) == (set(claims), set())
+        assert taken_usernames(shards, [*claims, "free"]) == set(claims)
+
+        release_usernames(shards, claims)
+        assert taken_usernames(shards, claims) == set()
+
+
+@pytest.mark.usefixtures("smtp_settings")
+def test_register_rejects_a_username_claimed_on_another_shard(router, monkeypatch):
+    from app.main import app
+
+    def sharded_sessions():
+        with ShardSessions(router) as shards:
+            yield shards
+
+    monkeypatch.setattr(auth, "shard_router", router)
+    monkeypatch.setitem(app.dependency_overrides, get_shards, sharded_sessions)
+    client = TestClient(app)
+    first, second = (
+        next(
+            email(i)
+            for i in range(USER_COUNT)
+            if router.shard_for_email(email(i)) == shard
+        )
+        for shard in (0, 1)
+    )
+    body = {"username": "alice", "password": "secret"}
+
+    response = client.post("/auth/register", json=body | {"email": first})
+    assert response.status_code == 200
+    assert router.decode_user_id(response.json()["id"])[0] == 0
+    response = client.post("/auth/register", json=body | {"email": second})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Username already exists"}
+    assert emails_by_shard(router) == {0: {first}, 1: set()}
+
+
+def test_reshard_moves_users_onto_the_new_layout(router, make_router):
+    add_users(router)
+    target = make_router("target", 3)
+
+    assert reshard_users(router, target, batch_size=7) == USER_COUNT
+
+    placed = emails_by_shard(target)
+    for shard, emails in placed.items():
+        assert all(target.shard_for_email(e) == shard for e in emails)
+    assert set().union(*placed.values()) == {email(i) for i in range(USER_COUNT)}
+    otps = {}
+    for shard in range(target.shard_count):
+        with target.session(shard) as db:
+            otps.update(
+                db.execute(
+                    select(User.email, UserOTP.otp).join(
+                        UserOTP, UserOTP.user_id == User.id
+                    )
+                ).all()
+            )
+    assert otps == {email(i): 10_000_000 + i for i in range(USER_COUNT)}
+    with ShardSessions(target) as shards:
+        assert taken_usernames(shards, [f"user{i}" for i in range(USER_COUNT)]) == {
+            f"user{i}" for i in range(USER_COUNT)
+        }
+    check_username_claims(target)
+    # Running it again copies nothing.
+    assert reshard_users(router, target) == 0
+
+
+def test_users_without_claims_are_refused(router):
+    add_users(router, claims=False)
+
+    with pytest.raises(RuntimeError, match="20 users have no username claim"):
+        check_username_claims(router)
+
+    with ShardSessions(router) as shards:
+        claim_usernames(shards, {f"user{i}": email(i) for i in range(USER_COUNT)})
+    check_username_claims(router)
+
+
+def test_app_stays_unready_while_claims_are_missing(router, monkeypatch, caplog):
+    from app import main
+
+    add_users(router, claims=False)
+    monkeypatch.setattr(main, "shard_router", router)
+    monkeypatch.setattr(main, "WARM_UP_RETRY_SECONDS", 0.05)
+
+    with TestClient(main.app) as client:
+        deadline = time.monotonic() + 10
+        while "no username claim" not in caplog.text:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert client.get("/ready").status_code == 503
+
+        with ShardSessions(router) as shards:
+            claim_usernames(shards, {f"user{i}": email(i) for i in range(USER_COUNT)})
+        wait_until_ready(client)
+
+
+def test_offline_migration_covers_every_shard(tmp_path):
+    urls = [f"sqlite:///{tmp_path}/shard{shard}.db" for shard in range(2)]
+    result = subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head", "--sql"],
+        cwd=Path(__file__).parents[1],
+        env=os.environ | {"SHARD_DATABASE_URLS": ",".join(urls)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    sections = result.stdout.split("-- Database: ")[1:]
+    assert [section.splitlines()[0] for section in sections] == urls
+    assert all("CREATE TABLE usernames" in section for section in sections)
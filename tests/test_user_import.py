@@ -0,0 +1,172 @@
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.auth_utils import verify_password
+from app.cli import main as cli_main
+from app.db import create_app_engine
+from app.models import User, UserOTP
+from app.sharding import ShardSessions, shard_router
+from app.user_import import UserImporter, detect_format, get_hash_pool, import_users
+from tests.conftest import ADMIN_KEY
+
+CSV = (
+    "email,username,password,verified\n"
+    "a@example.com,alice,secret-a,true\n"
+    "b@example.com,bob,secret-b,\n"
+    "not-an-email,carol,secret-c,\n"
+    "a@example.com,alice2,secret-a2,\n"
+    "d@example.com,bob,secret-d,\n"
+    "e@example.com,erin,secret-e,\n"
+)
+
+
+def run_import(data: str, fmt: str = "csv", **kwargs):
+    with ShardSessions(shard_router) as shards:
+        return import_users(shards, io.StringIO(data), fmt, **kwargs)
+
+
+def users(engine) -> dict[str, User]:
+    with engine.connect() as connection:
+        return {row.email: row for row in connection.execute(select(User))}
+
+
+def test_imports_valid_rows_and_reports_the_rest(database):
+    result = run_import(CSV, batch_size=2)
+
+    assert result.inserted == 3
+    assert result.duplicates == 2
+    assert result.invalid == 1
+    assert result.errors == ["line 4: invalid email"]
+
+    stored = users(database)
+    assert sorted(stored) == ["a@example.com", "b@example.com", "e@example.com"]
+    assert stored["a@example.com"].verified
+    assert not stored["b@example.com"].verified
+    assert verify_password("secret-b", stored["b@example.com"].password)
+    with database.connect() as connection:
+        otp_users = connection.scalars(select(UserOTP.user_id)).all()
+    assert sorted(otp_users) == sorted(user.id for user in stored.values())
+
+
+def test_rows_already_in_the_database_are_duplicates(database):
+    run_import(CSV)
+
+    result = run_import(
+        "email,username,password\n"
+        "a@example.com,new-name,pw\n"
+        "new@example.com,erin,pw\n"
+        "f@example.com,frank,pw\n"
+    )
+
+    assert (result.inserted, result.duplicates) == (1, 2)
+
+
+def test_jsonl_import_queues_verification_for_unverified_users(database):
+    lines = [
+        json.dumps({"email": "a@example.com", "username": "a", "password": "pw"}),
+        "{not json",
+        json.dumps(
+            {"email": "b@example.com", "username": "b", "password": "pw", "verified": 1}
+        ),
+        "",
+    ]
+
+    result = run_import("\n".join(lines), fmt="jsonl", send_verification=True)
+
+    assert result.inserted == 2
+    assert result.errors == ["line 2: not a JSON object"]
+    [(email, username, otp)] = result.verification_emails
+    assert (email, username) == ("a@example.com", "a")
+    with database.connect() as connection:
+        stored = connection.execute(
+            select(UserOTP.otp, UserOTP.used)
+            .join(User, User.id == UserOTP.user_id)
+            .where(User.email == "a@example.com")
+        ).one()
+    assert tuple(stored) == (otp, False)
+
+
+def test_rejects_non_positive_batch_size(database):
+    with pytest.raises(ValueError):
+        run_import(CSV, batch_size=0)
+
+
+def test_imports_share_one_hashing_pool():
+    with ShardSessions(shard_router) as shards:
+        first, second = UserImporter(shards), UserImporter(shards)
+    assert first.pool is second.pool is get_hash_pool()
+
+
+def test_detect_format():
+    assert detect_format("users.CSV") == "csv"
+    assert detect_format("users.ndjson") == "jsonl"
+    with pytest.raises(ValueError):
+        detect_format("users.txt")
+
+
+def test_admin_import_endpoint(database):
+    from app.main import app
+
+    client = TestClient(app)
+    headers = {"X-Admin-Key": ADMIN_KEY}
+
+    response = client.post(
+        "/admin/users/import",
+        headers=headers,
+        files={"file": ("users.csv", CSV.encode(), "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "inserted": 3,
+        "duplicates": 2,
+        "invalid": 1,
+        "errors": ["line 4: invalid email"],
+        "verification_emails_queued": 0,
+    }
+
+    for batch_size in (0, -1, 10**9):
+        response = client.post(
+            f"/admin/users/import?batch_size={batch_size}",
+            headers=headers,
+            files={"file": ("users.csv", CSV.encode(), "text/csv")},
+        )
+        assert response.status_code == 422
+
+    response = client.post(
+        "/admin/users/import",
+        headers=headers,
+        files={"file": ("users.txt", CSV.encode(), "text/plain")},
+    )
+    assert response.status_code == 400
+
+
+def test_cli_import(database, tmp_path, capsys):
+    path = tmp_path / "users.csv"
+    path.write_text(CSV)
+
+    assert cli_main(["import-users", str(path), "--hash-workers", "1"]) == 0
+    assert "inserted=3 duplicates=2 invalid=1" in capsys.readouterr().out
+
+
+def test_cli_rejects_unknown_extension_and_bad_batch_size(tmp_path, capsys):
+    path = tmp_path / "users.txt"
+    path.write_text(CSV)
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli_main(["import-users", str(path)])
+    assert exit_info.value.code == 2
+    assert "Cannot infer import format" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        cli_main(["import-users", str(path), "--format", "csv", "--batch-size", "0"])
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+def test_only_databases_with_on_conflict_are_accepted():
+    with pytest.raises(ValueError, match="Unsupported database backend 'mysql'"):
+        create_app_engine("mysql://user:pw@localhost/app")
+    assert create_app_engine("sqlite://").dialect.name == "sqlite"